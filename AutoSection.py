@@ -1,12 +1,26 @@
-import ezdxf
-import pandas as pd
+import time
+_IMPORT_T0 = time.perf_counter()  # 模块加载计时起点：launch 据此报告本脚本顶层导入耗时
 import os
 import math
-import re
 import sys
+import argparse
+import multiprocessing
+import numpy as np
+import shapely
+from shapely import STRtree
 from shapely.geometry import LineString, Point, box, Polygon
-from shapely.ops import unary_union, linemerge, polygonize
-from collections import defaultdict, Counter
+from shapely.ops import linemerge, polygonize
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from AutoSectionBatch import add_batch_arguments, run_batch, pause
+from AutoSectionLauncher import launch
+from AutoSectionIO import read_dxf, extract_layers, layer_lines
+from AutoSectionTopo import SNAP_GRID, node_lines, polygonize_tiled, connected_labels
+from AutoSectionCache import SectionCache, cache_path, digest
+from AutoSectionProfile import make_profiler
+from AutoSectionOutput import AREA_ERROR, HatchWriter, add_hatch_arguments, hatch_options, new_overlay, overlay_path
+from AutoSectionSink import ReportSink, report_for, merge_into, MERGED_COLUMNS
+from AutoSectionSink import station_sort_key  # noqa: F401  兼容再导出：原先定义在本文件，外部脚本仍可 from AutoSection import station_sort_key
 
 # ================= 核心配置 =================
 LAYER_OVER = "超挖框"
@@ -22,16 +36,7 @@ CYAN_EXTEND = 1.0
 # ===========================================
 
 def get_lines_raw(msp, layer):
-    lines = []
-    try: ents = msp.query(f'*[layer=="{layer}"]')
-    except: return []
-    for ent in ents:
-        if ent.dxftype() == 'LINE':
-            lines.append(LineString([ent.dxf.start.vec2, ent.dxf.end.vec2]))
-        elif ent.dxftype() in ('LWPOLYLINE', 'POLYLINE'):
-            pts = [p[:2] for p in ent.get_points()] if ent.dxftype() == 'LWPOLYLINE' else [v.vtx.vec2 for v in ent.vertices]
-            if len(pts) >= 2: lines.append(LineString(pts))
-    return lines
+    return layer_lines(extract_layers(msp, {layer}), layer)
 
 def extend_line_simple(line, dist):
     coords = list(line.coords)
@@ -46,6 +51,27 @@ def extend_line_simple(line, dist):
     new_end = (p_n.x + vec_e[0]/mag_e*dist, p_n.y + vec_e[1]/mag_e*dist)
     return LineString([new_start] + coords + [new_end])
 
+def dangling_ends(lines, ndigits=3):
+    # 端点度数表：端点坐标量化后一次性 np.unique 计数，返回每条线 [起点悬空, 终点悬空] 掩码
+    if not lines: return np.zeros((0, 2), dtype=bool)
+    arr = np.asarray(lines, dtype=object)
+    ends = np.stack([shapely.get_coordinates(shapely.get_point(arr, 0)), shapely.get_coordinates(shapely.get_point(arr, -1))], axis=1)
+    _, inv, cnt = np.unique(np.round(ends.reshape(-1, 2), ndigits), axis=0, return_inverse=True, return_counts=True)
+    return (cnt[inv.ravel()] == 1).reshape(-1, 2)
+
+def group_sections(lines, pad=5.0):
+    # 断面分组：外扩 pad 后会相交的设计线（间距 < 2*pad）用并查集归为一组，
+    # 返回按左边界排序的各组外扩包围盒，等价于 unary_union(buffer(pad)) 各块的 bounds
+    if not lines: return []
+    a, b = STRtree(lines).query(lines, predicate='dwithin', distance=2 * pad)
+    lab = connected_labels(len(lines), a, b)
+    groups, inv = np.unique(lab, return_inverse=True)
+    bb = shapely.bounds(np.asarray(lines, dtype=object))
+    lo = np.full((len(groups), 2), np.inf); hi = np.full((len(groups), 2), -np.inf)
+    np.minimum.at(lo, inv, bb[:, :2]); np.maximum.at(hi, inv, bb[:, 2:])
+    boxes = np.hstack([lo - pad, hi + pad])
+    return [tuple(r) for r in boxes[np.argsort(boxes[:, 0], kind='stable')]]
+
 def build_final_poly(lines, ground_poly, top_y):
     if not lines: return None
     all_pts = []
@@ -64,134 +90,275 @@ def quick_draw(msp, doc, geom, ly, col, closed=False):
         pts = list(geom.coords) if isinstance(geom, LineString) else list(geom.exterior.coords)
         msp.add_lwpolyline(pts, dxfattribs={'layer': ly, 'closed': closed, 'color': col})
 
-def station_sort_key(station_str):
-    nums = re.findall(r'\d+', str(station_str))
-    # 考虑 K71+300 结构，组合为整数排序
-    return int("".join(nums)) if nums else 0
+def index_query(tree, geom, predicate='intersects'):
+    # 空间索引查询，按原始顺序返回命中下标（保证与线性扫描结果一致）
+    return np.sort(tree.query(geom, predicate=predicate))
+
+def clean_text(txt):
+    return txt.split(";")[-1].replace("}", "").strip()
+
+def make_section_context(ground, design, over, geo, geo_free, stations, labels):
+    # 断面内核的只读共享输入：各图层线、空间索引、文字 (x, y, 内容) 记录
+    ctx = {'ground': ground, 'design': design, 'over': over, 'geo': geo, 'geo_free': geo_free, 'stations': stations, 'labels': labels}
+    for key in ('ground', 'design', 'over', 'geo'): ctx[key + '_tree'] = STRtree(ctx[key])
+    ctx['station_pts'] = [Point(x, y) for x, y, _ in stations]
+    ctx['station_tree'] = STRtree(ctx['station_pts'])
+    ctx['label_tree'] = STRtree([Point(x, y) for x, y, _ in labels])
+    return ctx
+
+def compute_section(ctx, idx, bounds):
+    # V71 单断面计算内核，返回该断面的报表行
+    x1, y1, x2, y2 = bounds
+    min_x, max_x, min_y, max_y = x1-MARGIN_X, x2+MARGIN_X, y1-MARGIN_Y, y2+MARGIN_Y
+    sec_box = box(min_x, min_y, max_x, max_y)
+
+    # 桩号识别
+    current_st = f"S{idx}"; best_d = 1e6
+    for k in index_query(ctx['station_tree'], sec_box, 'contains'):
+        d = ctx['station_pts'][k].distance(Point((x1+x2)/2, y1))
+        if d < best_d:
+            best_d = d; current_st = ctx['stations'][k][2]
+
+    # V71 原版逻辑
+    local_ground = [ctx['ground'][k] for k in index_query(ctx['ground_tree'], sec_box)]
+    if not local_ground: return []
+    g_pts = sorted([p for l in local_ground for p in l.coords], key=lambda x: x[0])
+    red_geom = LineString([(min_x, g_pts[0][1])] + g_pts + [(max_x, g_pts[-1][1])])
+    ground_poly = Polygon([(min_x, min_y), (max_x, min_y), (max_x, g_pts[-1][1])] + g_pts[::-1] + [(min_x, g_pts[0][1])]).buffer(0)
+
+    yellow_final = build_final_poly([ctx['design'][k] for k in index_query(ctx['design_tree'], sec_box)], ground_poly, max_y)
+    total_over = build_final_poly([ctx['over'][k] for k in index_query(ctx['over_tree'], sec_box)], ground_poly, max_y)
+    purple_final = total_over.difference(yellow_final) if (total_over and yellow_final) else total_over
+
+    green_lines = []
+    avoid_area = total_over.buffer(0.5) if total_over else None
+    for k in index_query(ctx['geo_tree'], sec_box):
+        c = list(ctx['geo'][k].coords)
+        for i in [0, -1]:
+            pt = Point(c[i])
+            if ctx['geo_free'][k][i] and red_geom.distance(pt) > 0.5 and (not avoid_area or not avoid_area.contains(pt)):
+                tx = min_x if abs(c[i][0]-min_x) < abs(c[i][0]-max_x) else max_x
+                if i == 0: c.insert(0, (tx, c[i][1]))
+                else: c.append((tx, c[i][1]))
+        green_lines.append(LineString(c))
+
+    blue_cutters = node_lines([LineString([(min_x, min_y), (max_x, min_y)]), LineString([(min_x, min_y), (min_x, max_y)]), LineString([(max_x, min_y), (max_x, max_y)]), red_geom] + [extend_line_simple(l, CYAN_EXTEND) for l in green_lines])
+
+    # 面筛选整批向量化：形心在框内、面积 > 0.1、形心低于地面线（地面线按 x 分段线性插值）
+    faces = np.asarray(list(polygonize(blue_cutters)), dtype=object)
+    section_agg = defaultdict(lambda: {'d': 0.0, 'o': 0.0})
+    if not len(faces): return []
+    cx, cy = shapely.get_coordinates(shapely.centroid(faces)).T
+    gx, gy = np.asarray(red_geom.coords).T
+    faces = faces[shapely.contains_xy(sec_box, cx, cy) & (shapely.area(faces) > 0.1) & (cy < np.interp(cx, gx, gy))]
+    if not len(faces): return []
+
+    # 文字归属：一次索引查询求出每个面 0.3 范围内的文字，取原始顺序最靠前的一条
+    names = ["未知"] * len(faces)
+    near = index_query(ctx['label_tree'], box(*shapely.total_bounds(faces)).buffer(0.3, join_style=2))
+    if len(near):
+        ti, fj = STRtree(faces).query(shapely.points([ctx['labels'][k][:2] for k in near]), predicate='dwithin', distance=0.3)
+        for t, j in sorted(zip(ti, fj), reverse=True): names[j] = ctx['labels'][near[t]][2]
+
+    da = shapely.area(shapely.intersection(faces, yellow_final)) if yellow_final else np.zeros(len(faces))
+    oa = shapely.area(shapely.intersection(faces, purple_final)) if purple_final else np.zeros(len(faces))
+    for name, d, o in zip(names, da, oa):
+        section_agg[name]['d'] += d; section_agg[name]['o'] += o
+
+    rows = []
+    for name, areas in section_agg.items():
+        if areas['d'] > 0.1 or areas['o'] > 0.1:
+            rows.append({'断面': f'S{idx}', '桩号': current_st, '地层': name, '设计': round(areas['d'], 3), '净超挖': round(areas['o'], 3)})
+    return rows
+
+def section_key(ctx, bounds):
+    # 断面缓存键：框内各图层线（整条 WKB）、悬空端点标记、桩号与可能落入的地层文字，以及内核参数
+    x1, y1, x2, y2 = bounds
+    sec_box = box(x1-MARGIN_X, y1-MARGIN_Y, x2+MARGIN_X, y2+MARGIN_Y)
+    parts, local = [MARGIN_X, MARGIN_Y, CYAN_EXTEND, SNAP_GRID, tuple(bounds)], [sec_box]
+    for key in ('ground', 'design', 'over', 'geo'):
+        hits = index_query(ctx[key + '_tree'], sec_box)
+        geoms = [ctx[key][k] for k in hits]
+        parts.append(shapely.to_wkb(np.asarray(geoms, dtype=object)).tolist()); local += geoms
+    parts.append(ctx['geo_free'][index_query(ctx['geo_tree'], sec_box)])
+    parts.append([ctx['stations'][k] for k in index_query(ctx['station_tree'], sec_box, 'contains')])
+    reach = box(*shapely.total_bounds(local)).buffer(0.3, join_style=2)
+    parts.append([ctx['labels'][k] for k in index_query(ctx['label_tree'], reach)])
+    return digest('section', *parts)
+
+def cached_sections(ctx, tasks, cache, compute):
+    # 命中缓存的断面直接取结果（断面编号按本次顺序改写），其余交给 compute 计算后写回缓存；
+    # 按断面顺序逐个产出，算完一个即可写出一个
+    keys = [section_key(ctx, bounds) for _, bounds in tasks]
+    section_rows, todo = [None] * len(tasks), []
+    for i, ((idx, _), key) in enumerate(zip(tasks, keys)):
+        hit = cache.get(key)
+        if hit is None: todo.append(i); continue
+        old_idx, rows = hit
+        section_rows[i] = [{**r, '断面': f'S{idx}', '桩号': f'S{idx}' if r['桩号'] == f'S{old_idx}' else r['桩号']} for r in rows]
+    print(f"缓存：{len(tasks) - len(todo)}/{len(tasks)} 个断面命中，重算 {len(todo)} 个")
+    fresh = iter(compute([tasks[i] for i in todo]))
+    for i, rows in enumerate(section_rows):
+        if rows is None:
+            rows = next(fresh); cache.put(keys[i], (tasks[i][0], rows))
+        yield rows
+
+# 进程池工作进程：几何以 WKB 传入，每个进程只还原一次共享输入
+_SECTION_CTX = None
 
-def process_file(input_path):
+def _init_section_worker(payload):
+    global _SECTION_CTX
+    geoms = {k: list(shapely.from_wkb(payload[k])) for k in ('ground', 'design', 'over', 'geo')}
+    _SECTION_CTX = make_section_context(geoms['ground'], geoms['design'], geoms['over'], geoms['geo'], payload['geo_free'], payload['stations'], payload['labels'])
+
+def timed_section(ctx, idx, bounds):
+    # 返回 (报表行, 耗时)，供 --profile 统计逐断面耗时
+    t0 = time.perf_counter()
+    return compute_section(ctx, idx, bounds), time.perf_counter() - t0
+
+def _section_worker(task):
+    return timed_section(_SECTION_CTX, *task)
+
+def process_file(input_path, workers=1, streaming=False, tile_size=0, use_cache=True, profile=False, report_formats=('xlsx',), overlay=False,
+                 simplify=0.0, vertex_budget=0, area_error=AREA_ERROR):
     print(f"\n[处理开始] -> {os.path.basename(input_path)}")
+    base = os.path.splitext(input_path)[0]  # 扩展名大小写不定（X.DXF），输出名一律由主名派生，绝不覆盖原图
+    prof = make_profiler(profile, input_path)
+    sinks = []
+    cache = SectionCache(cache_path(input_path)) if use_cache else None
     try:
-        doc = ezdxf.readfile(input_path)
-        msp = doc.modelspace()
+        # 单次遍历模型空间，各阶段共用按图层分桶的线与文字
+        core_layers = {LAYER_OVER, LAYER_DESIGN, LAYER_GROUND, LAYER_GEO}
+        with prof.stage('read') as st:
+            doc, data = read_dxf(input_path, core_layers | {LAYER_STATION}, streaming=streaming, cache=cache)
+            st['entities'] = sum(map(len, data['lines'].values())) + sum(map(len, data['texts'].values()))
+            st['curve_hits'], st['curves_flattened'] = data['curves']
+        # 叠加图模式只写生成的图层，不依赖原图文档，可与流式读取同时使用
+        out_doc = new_overlay(doc) if overlay else doc
+        if out_doc is None: print("流式读取：仅输出算量报表，不回写图纸")
 
         # 1. 独立填充模块
-        core_layers = {LAYER_OVER, LAYER_DESIGN, LAYER_GROUND, LAYER_GEO}
         fill_lines = []
-        for ly in core_layers: fill_lines.extend(get_lines_raw(msp, ly))
-        if fill_lines:
-            if LAYER_HATCH not in doc.layers: doc.layers.add(LAYER_HATCH, color=7)
-            pure_polys = list(polygonize(unary_union(fill_lines)))
+        for ly in sorted(core_layers): fill_lines.extend(layer_lines(data, ly))
+        if fill_lines and out_doc is not None:
+            # 超大图纸可分块构面（tile_size > 0），结果与整图构面一致
+            with prof.stage('hatch_polygonize') as st:
+                if tile_size: pure_polys = polygonize_tiled(fill_lines, tile_size, workers, cache=cache)
+                else:
+                    key = digest('hatch', SNAP_GRID, shapely.to_wkb(np.asarray(fill_lines, dtype=object)).tolist())
+                    hit = cache.get(key) if cache else None
+                    pure_polys = list(shapely.from_wkb(hit)) if hit is not None else list(polygonize(node_lines(fill_lines)))
+                    if cache and hit is None: cache.put(key, shapely.to_wkb(np.asarray(pure_polys, dtype=object), hex=True).tolist())
+                st['lines'], st['faces'] = len(fill_lines), len(pure_polys)
             rgb_list = [(255,200,200), (200,255,200), (200,200,255), (255,255,180), (220,180,255)]
-            for i, poly in enumerate([p for p in pure_polys if p.area > 0.1]):
-                try:
-                    h = msp.add_hatch(dxfattribs={'layer': LAYER_HATCH})
-                    h.rgb = rgb_list[i % len(rgb_list)]; h.set_pattern_fill('ANSI31', scale=0.8)
-                    h.paths.add_polyline_path(list(poly.exterior.coords)[:-1], is_closed=True)
-                except: continue
+            with prof.stage('hatch_write') as st:
+                hatch_polys = [p for p in pure_polys if p.area > 0.1]
+                hatches = HatchWriter(out_doc, LAYER_HATCH, simplify=simplify, vertex_budget=vertex_budget, area_error=area_error)
+                for i, poly in enumerate(hatch_polys):
+                    try: hatches.add_polygon(Polygon(poly.exterior), 'ANSI31', 0.8, rgb_list[i % len(rgb_list)])
+                    except: continue
+                st['hatches'], st['vertices_in'], st['vertices_out'] = len(hatch_polys), hatches.vertices_in, hatches.vertices_out
+            print(f"  {hatches.summary()}")
 
         # 2. V71 计算内核
-        all_design_raw = get_lines_raw(msp, LAYER_DESIGN)
+        all_design_raw = layer_lines(data, LAYER_DESIGN)
         if not all_design_raw: 
             print("跳过：未发现设计线层数据"); return
         
-        group_polys = list(unary_union([l.buffer(5.0) for l in all_design_raw]).geoms)
-        group_polys.sort(key=lambda p: p.bounds[0])
-
-        all_ground = get_lines_raw(msp, LAYER_GROUND)
-        all_over_raw = get_lines_raw(msp, LAYER_OVER)
-        all_geo_raw = get_lines_raw(msp, LAYER_GEO)
-        all_texts = [e for e in msp.query(f'*[layer=="{LAYER_GEO}"]') if e.dxftype() in ('TEXT', 'MTEXT')]
-        station_texts = [e for e in msp.query(f'*[layer=="{LAYER_STATION}"]') if e.dxftype() in ('TEXT', 'MTEXT')]
+        with prof.stage('group_sections') as st:
+            group_bounds = group_sections(all_design_raw, 5.0)
+            st['design_lines'], st['sections'] = len(all_design_raw), len(group_bounds)
+
+        all_ground = layer_lines(data, LAYER_GROUND)
+        all_over_raw = layer_lines(data, LAYER_OVER)
+        all_geo_raw = layer_lines(data, LAYER_GEO)
         
-        merged_geo = linemerge(unary_union(all_geo_raw))
-        geo_list = list(merged_geo.geoms) if hasattr(merged_geo, 'geoms') else [merged_geo]
-
-        final_report_data = []
-        for idx, g_poly in enumerate(group_polys, 1):
-            x1, y1, x2, y2 = g_poly.bounds
-            min_x, max_x, min_y, max_y = x1-MARGIN_X, x2+MARGIN_X, y1-MARGIN_Y, y2+MARGIN_Y
-            sec_box = box(min_x, min_y, max_x, max_y)
-            
-            # 桩号识别
-            current_st = f"S{idx}"; best_d = 1e6
-            for st in station_texts:
-                pt = Point(st.dxf.insert.vec2)
-                if sec_box.contains(pt):
-                    d = pt.distance(Point((x1+x2)/2, y1))
-                    if d < best_d: 
-                        best_d = d; txt = st.dxf.text if st.dxftype()=='TEXT' else st.text
-                        current_st = txt.split(";")[-1].replace("}", "").strip()
-
-            # V71 原版逻辑
-            local_ground = [l for l in all_ground if sec_box.intersects(l)]
-            if not local_ground: continue
-            g_pts = sorted([p for l in local_ground for p in l.coords], key=lambda x: x[0])
-            red_geom = LineString([(min_x, g_pts[0][1])] + g_pts + [(max_x, g_pts[-1][1])])
-            ground_poly = Polygon([(min_x, min_y), (max_x, min_y), (max_x, g_pts[-1][1])] + g_pts[::-1] + [(min_x, g_pts[0][1])]).buffer(0)
-            
-            yellow_final = build_final_poly([l for l in all_design_raw if sec_box.intersects(l)], ground_poly, max_y)
-            total_over = build_final_poly([l for l in all_over_raw if sec_box.intersects(l)], ground_poly, max_y)
-            purple_final = total_over.difference(yellow_final) if (total_over and yellow_final) else total_over
-
-            nodes = Counter([p for g in geo_list for p in [tuple(round(v,3) for v in g.coords[0]), tuple(round(v,3) for v in g.coords[-1])]])
-            green_lines = []
-            avoid_area = total_over.buffer(0.5) if total_over else None
-            for l in geo_list:
-                if not sec_box.intersects(l): continue
-                c = list(l.coords)
-                for i in [0, -1]:
-                    pt = Point(c[i])
-                    if nodes[tuple(round(v,3) for v in c[i])] == 1 and red_geom.distance(pt) > 0.5 and (not avoid_area or not avoid_area.contains(pt)):
-                        tx = min_x if abs(c[i][0]-min_x) < abs(c[i][0]-max_x) else max_x
-                        if i == 0: c.insert(0, (tx, c[i][1]))
-                        else: c.append((tx, c[i][1]))
-                green_lines.append(LineString(c))
-            
-            blue_cutters = unary_union([LineString([(min_x, min_y), (max_x, min_y)]), LineString([(min_x, min_y), (min_x, max_y)]), LineString([(max_x, min_y), (max_x, max_y)]), red_geom, unary_union([extend_line_simple(l, CYAN_EXTEND) for l in green_lines])])
-            
-            section_agg = defaultdict(lambda: {'d': 0.0, 'o': 0.0})
-            for p in polygonize(blue_cutters):
-                if sec_box.contains(p.centroid) and p.area > 0.1 and p.centroid.y < red_geom.interpolate(red_geom.project(p.centroid)).y:
-                    name = "未知"
-                    for txt in all_texts:
-                        if p.buffer(0.3).contains(Point(txt.dxf.insert.vec2)):
-                            name = (txt.dxf.text if txt.dxftype()=='TEXT' else txt.text).split(";")[-1].replace("}", "").strip(); break
-                    da = p.intersection(yellow_final).area if (yellow_final and p.intersects(yellow_final)) else 0
-                    oa = p.intersection(purple_final).area if (purple_final and p.intersects(purple_final)) else 0
-                    section_agg[name]['d'] += da; section_agg[name]['o'] += oa
-
-            for name, areas in section_agg.items():
-                if areas['d'] > 0.1 or areas['o'] > 0.1:
-                    final_report_data.append({'断面': f'S{idx}', '桩号': current_st, '地层': name, '设计': round(areas['d'], 3), '净超挖': round(areas['o'], 3)})
-
-        # 3. 结果输出
-        if final_report_data:
-            df = pd.DataFrame(final_report_data)
-            df['sort_key'] = df['桩号'].apply(station_sort_key)
-            df_sorted = df.sort_values(by='sort_key')
-            report_name = input_path.replace(".dxf", "_算量汇总.xlsx")
-            with pd.ExcelWriter(report_name) as writer:
-                df[['断面', '地层', '设计', '净超挖']].to_excel(writer, sheet_name='Sheet1', index=False)
-                df_sorted.pivot_table(index='桩号', columns='地层', values='设计', aggfunc='sum', sort=False).fillna(0).to_excel(writer, sheet_name='设计量汇总')
-                df_sorted.pivot_table(index='桩号', columns='地层', values='净超挖', aggfunc='sum', sort=False).fillna(0).to_excel(writer, sheet_name='净超挖汇总')
+        with prof.stage('geo_network') as st:
+            merged_geo = linemerge(node_lines(all_geo_raw))
+            geo_list = list(merged_geo.geoms) if hasattr(merged_geo, 'geoms') else [merged_geo]
+            geo_free = dangling_ends(geo_list)
+            st['geo_lines'] = len(geo_list)
+
+        # 文字只保留 (x, y, 内容)，便于在进程间传递
+        stations = [(x, y, clean_text(t)) for x, y, t in data['texts'][LAYER_STATION]]
+        labels = [(x, y, clean_text(t)) for x, y, t in data['texts'][LAYER_GEO]]
+        tasks = [(idx, bounds) for idx, bounds in enumerate(group_bounds, 1)]
+
+        ctx = make_section_context(all_ground, all_design_raw, all_over_raw, geo_list, geo_free, stations, labels)
+
+        def _profiled(todo, timed):
+            for (idx, _), (rows, sec) in zip(todo, timed):
+                prof.section(idx, rows[0]['桩号'] if rows else f"S{idx}", sec)
+                yield rows
+
+        def compute(todo):
+            # 按断面顺序逐个产出报表行；进程池 map 同样按序返回
+            if workers > 1 and len(todo) > 1:
+                payload = {'ground': shapely.to_wkb(all_ground), 'design': shapely.to_wkb(all_design_raw), 'over': shapely.to_wkb(all_over_raw),
+                           'geo': shapely.to_wkb(geo_list), 'geo_free': geo_free, 'stations': stations, 'labels': labels}
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_section_worker, initargs=(payload,)) as pool:
+                    timed = pool.map(_section_worker, todo, chunksize=max(1, len(todo) // (workers * 4)))
+                    yield from _profiled(todo, timed)
+            else: yield from _profiled(todo, (timed_section(ctx, *task) for task in todo))
+
+        # 3. 结果输出：断面算完即写入报表，只在内存中保留 桩号×地层 汇总
+        report_base = base + "_算量汇总."
+        sinks = [ReportSink(report_base + fmt) for fmt in report_formats]
+        with prof.stage('sections') as st:
+            for rows in (cached_sections(ctx, tasks, cache, compute) if cache else compute(tasks)):
+                for sink in sinks: sink.add(rows)
+            st['sections'], st['rows'] = len(tasks), sinks[0].rows if sinks else 0
+            if cache: st['cache_hits'] = cache.hits
+        with prof.stage('report'):
+            for sink in sinks: sink.close()
         
-        doc.saveas(input_path.replace(".dxf", "_RESULT.dxf"))
+        if out_doc is not None:
+            output_path = base + "_RESULT.dxf"
+            with prof.stage('saveas'): out_doc.saveas(overlay_path(output_path) if overlay else output_path)
+        prof.write(base)
         print(f"✅ 处理成功！报表已生成。")
+        return True
 
     except Exception as e:
         print(f"❌ 处理出错: {e}")
+        for sink in sinks: sink.abort()
+        return False
+    finally:
+        if cache: cache.close()
 
-if __name__ == "__main__":
+def main(argv=None):
     print("========================================")
     print("   CAD 断面算量自动化工具 (V83 封装版)   ")
     print("   使用说明: 请将 DXF 文件直接拖入此处   ")
     print("========================================")
     
+    parser = add_batch_arguments(argparse.ArgumentParser())
+    parser.add_argument("--workers", type=int, default=1, help="单文件内断面计算/分块构面并行进程数")
+    parser.add_argument("--tile-size", type=float, default=0, help="整图填充分块边长（图纸单位），0 为不分块")
+    parser.add_argument("--no-cache", action="store_true", help="不使用增量计算缓存（DXF 旁的 _cache.sqlite）")
+    parser.add_argument("--stream", action="store_true", help="流式读取超大图纸（低内存，仅输出报表）")
+    parser.add_argument("--profile", action="store_true", help="输出分阶段耗时/内存剖析报告（_profile.json / _profile.csv）")
+    parser.add_argument("--format", default="xlsx", help="单文件报表格式，逗号分隔：xlsx,csv,parquet")
+    parser.add_argument("--overlay", action="store_true", help="只输出填充图层的叠加图（_RESULT_overlay.dxf），不整图另存；可配合 --stream")
+    add_hatch_arguments(parser)
+    parser.add_argument("--merge", help="把本批所有文件合并为一份按桩号排序的总表（.xlsx / .csv / .parquet）")
+    args = parser.parse_args(argv)
+    formats = tuple(f.strip().lower() for f in args.format.split(",") if f.strip())
+
     # 支持拖拽或命令行输入
-    files = sys.argv[1:] if len(sys.argv) > 1 else [input("请拖入或输入DXF文件路径: ").strip('"')]
-    
-    for f in files:
-        if f.lower().endswith(".dxf"): process_file(f)
+    files = args.files or ([] if args.no_pause else [input("请拖入或输入DXF文件路径: ").strip('"')])
+    # 合并总表随每个文件完成逐步追加，批处理中途即可看到已完成部分的结果
+    merged = ReportSink(args.merge, MERGED_COLUMNS) if args.merge else None
+    def collect(res):
+        report = report_for(res[0], formats) if merged and res[1] else None
+        if report: merge_into(merged, report, os.path.splitext(os.path.basename(res[0]))[0])
+    results = run_batch(process_file, files, jobs=args.jobs, on_result=collect, workers=args.workers, streaming=args.stream, tile_size=args.tile_size,
+                        use_cache=not args.no_cache, profile=args.profile, report_formats=formats, overlay=args.overlay, **hatch_options(args))
+    if merged: print(f"合并总表 -> {args.merge}" if merged.close() else "合并总表：没有可合并的数据")
     
-    input("\n任务完成，按回车键退出...")
\ No newline at end of file
+    pause(args)
+    return 0 if all(r[1] for r in results) else 1
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(launch('section', sys.argv[1:], main, _IMPORT_T0))
\ No newline at end of file
@@ -0,0 +1,76 @@
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ================= 批处理公共模块 =================
+# AutoSection / AutoSection_Drag / AutoSection_Final_Adaptive / AutoSectionReport 共用的多文件驱动：
+# 通配符展开、有界进程池、逐文件进度与计时、单文件失败隔离、最终汇总
+# =================================================
+
+# 各入口自身生成的 DXF，通配符/目录展开时跳过，避免重复处理
+OUTPUT_SUFFIXES = ("_RESULT.dxf", "_填充完成.dxf", "_算量自适应版.dxf", "_Final_v1.dxf", "_overlay.dxf")
+
+def is_output(path):
+    # Windows 下 glob 不区分大小写（*.dxf 也匹配 X.DXF），后缀比较同样忽略大小写
+    return path.lower().endswith(tuple(s.lower() for s in OUTPUT_SUFFIXES))
+
+def add_batch_arguments(parser):
+    parser.add_argument("files", nargs="*", help="DXF 文件或通配符，如 D:/断面/*.dxf")
+    parser.add_argument("--jobs", type=int, default=1, help="同时处理的文件数（进程池大小）")
+    parser.add_argument("--no-pause", action="store_true", help="无人值守模式：结束时不等待回车")
+    return parser
+
+def expand_inputs(patterns):
+    # 展开通配符/目录，只保留 .dxf，去重并保持输入顺序
+    files = []
+    for pat in patterns:
+        pat = pat.strip('"')
+        if os.path.isdir(pat) or glob.has_magic(pat):
+            hits = glob.glob(os.path.join(pat, "*.dxf") if os.path.isdir(pat) else pat)
+            hits = sorted(f for f in hits if not is_output(f))
+        else: hits = [pat]
+        files.extend(os.path.normpath(f) for f in hits if f.lower().endswith(".dxf"))
+    return list(dict.fromkeys(files))
+
+def _run_one(func, path, kwargs):
+    t0 = time.perf_counter()
+    try:
+        result = func(path, **kwargs)
+        return path, result is not False, result, time.perf_counter() - t0, None
+    except Exception as e:
+        return path, False, None, time.perf_counter() - t0, f"{e}\n{traceback.format_exc()}"
+
+def run_batch(func, inputs, jobs=1, on_result=None, **kwargs):
+    # 依次或并行对每个文件调用 func(path, **kwargs)，返回按输入顺序排列的 (path, ok, result, seconds, error)
+    # func 抛出异常或返回 False 记为失败，不影响其余文件；on_result 在每个文件完成时（主进程内）回调
+    files = expand_inputs(inputs)
+    if not files:
+        print("[提示] 未找到任何 DXF 文件。"); return []
+    total, t_start, results = len(files), time.perf_counter(), []
+
+    def report(res):
+        results.append(res)
+        path, ok, result, sec, err = res
+        extra = "" if result in (None, True, False) else f" -> {result}"
+        print(f"[{len(results)}/{total}] {'✅' if ok else '❌'} {os.path.basename(path)} ({sec:.2f}s){extra}", flush=True)
+        if err: print(err.rstrip())
+        if on_result: on_result(res)
+
+    if jobs > 1 and total > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, total)) as pool:
+            futures = [pool.submit(_run_one, func, f, kwargs) for f in files]
+            for fut in as_completed(futures): report(fut.result())
+    else:
+        for f in files: report(_run_one(func, f, kwargs))
+
+    failed = [r for r in results if not r[1]]
+    print("----------------------------------------")
+    print(f"批处理完成：成功 {total - len(failed)} / {total}，失败 {len(failed)}，总耗时 {time.perf_counter() - t_start:.2f}s")
+    for path, *_ in failed: print(f"  ❌ {path}")
+    order = {f: i for i, f in enumerate(files)}
+    return sorted(results, key=lambda r: order[r[0]])
+
+def pause(args, msg="\n任务完成，按回车键退出..."):
+    if not args.no_pause: input(msg)
\ No newline at end of file
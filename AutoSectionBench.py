@@ -0,0 +1,235 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import ezdxf
+from AutoSection import LAYER_OVER, LAYER_DESIGN, LAYER_GROUND, LAYER_GEO, LAYER_STATION
+from AutoSectionProfile import peak_rss_mb
+
+# ================= 合成断面与基准测试 =================
+# 生成面积可解析计算的合成断面 DXF，对四条处理流程做规模化计时、峰值内存统计，
+# 并与解析解核对算量结果，防止性能优化悄悄改变工程量
+# =====================================================
+
+SECTION_PITCH = 200.0  # 相邻断面的水平间距
+PIPELINES = ('section', 'drag', 'final', 'report', 'section_tiled', 'final_tiled', 'section_cached')
+# 变体：在基础流程上打开分块构面/多进程（--tile-size、--workers）或增量缓存（先冷跑一次，计时与核对取热跑）
+VARIANTS = {'section_tiled': ('section', 'tiled'), 'final_tiled': ('final', 'tiled'), 'section_cached': ('section', 'cached')}
+
+def _u_width(y, y0, w0, y1, w1):
+    # U 形开挖线在高程 y 处的全宽（两侧直线边，底 y0 半宽 w0，顶 y1 半宽 w1）
+    return 2 * (w0 + (w1 - w0) * (y - y0) / (y1 - y0))
+
+def _u_area(a, b, y0, w0, y1, w1):
+    # U 形在 [a, b] 高程区间内的面积（梯形积分，区间先裁剪到 U 的高程范围）
+    a, b = max(a, y0), min(b, y1)
+    if b <= a: return 0.0
+    return (b - a) * (_u_width(a, y0, w0, y1, w1) + _u_width(b, y0, w0, y1, w1)) / 2
+
+def _dense(pts, density):
+    # 每条边插入共线点，增加顶点数但不改变几何
+    out = [pts[0]]
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+        out += [(x0 + (x1 - x0) * k / density, y0 + (y1 - y0) * k / density) for k in range(1, density + 1)]
+    return out
+
+def make_synthetic_dxf(path, sections=20, geo_layers=3, density=1, gap=0.0, texts=1, seed=0):
+    # 每个断面：水平地面线、U 形设计线（顶部高出地面）、外包超挖线、水平地质分层线、地层与桩号文字。
+    # gap > 0 时设计线底边断开 gap 宽的缺口（不影响解析面积，只改变线网闭合情况）。
+    # 返回 {断面序号: {地层名: (设计, 净超挖)}} 的解析解
+    rnd = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for ly in (LAYER_OVER, LAYER_DESIGN, LAYER_GROUND, LAYER_GEO, LAYER_STATION): doc.layers.add(ly)
+    names = [f"{i + 1}号地层" for i in range(geo_layers + 1)]
+    expected = {}
+    for s in range(sections):
+        xc = s * SECTION_PITCH
+        g = 100.0 + rnd.uniform(-2, 2)
+        bottom, top = g - rnd.uniform(15, 25), g + 3.0
+        w_top, w_bot = rnd.uniform(16, 20), rnd.uniform(8, 12)
+        msp.add_lwpolyline(_dense([(xc - 50, g), (xc + 50, g)], density * 10), dxfattribs={'layer': LAYER_GROUND})
+        left = _dense([(xc - w_top, top), (xc - w_bot, bottom), (xc - gap / 2, bottom)], density)
+        right = _dense([(xc + gap / 2, bottom), (xc + w_bot, bottom), (xc + w_top, top)], density)
+        if gap > 0:
+            msp.add_lwpolyline(left, dxfattribs={'layer': LAYER_DESIGN}); msp.add_lwpolyline(right, dxfattribs={'layer': LAYER_DESIGN})
+        else: msp.add_lwpolyline(left + right[1:], dxfattribs={'layer': LAYER_DESIGN})
+        o_bot, o_wb, o_wt = bottom - 1.0, w_bot + 0.5, w_top + 1.0
+        msp.add_lwpolyline(_dense([(xc - o_wt, top), (xc - o_wb, o_bot), (xc + o_wb, o_bot), (xc + o_wt, top)], density), dxfattribs={'layer': LAYER_OVER})
+
+        # 分层线在地面与设计底之间均分后抖动，保证每层厚度远大于文字归属的 0.3 容差
+        slot = (g - bottom - 2) / (geo_layers + 1)
+        levels = [g - 1 - slot * (i + 1) + rnd.uniform(-0.25, 0.25) * slot for i in range(geo_layers)]
+        for y in levels: msp.add_line((xc - 40, y), (xc + 40, y), dxfattribs={'layer': LAYER_GEO})
+        bands = list(zip([g] + levels, levels + [o_bot - 1.0]))
+        sec = {}
+        for name, (hi, lo) in zip(names, bands):
+            for k in range(texts):
+                msp.add_text(name, dxfattribs={'layer': LAYER_GEO, 'height': 0.5, 'insert': (xc - 38 + k * 2.0, (hi + lo) / 2)})
+            d = _u_area(lo, hi, bottom, w_bot, top, w_top)
+            o = _u_area(lo, hi, o_bot, o_wb, top, o_wt) - d
+            if d > 0.1 or o > 0.1: sec[name] = (d, o)
+        msp.add_text(f"K{s // 50}+{(s % 50) * 20:03d}", dxfattribs={'layer': LAYER_STATION, 'height': 1.0, 'insert': (xc, o_bot - 8)})
+        expected[s + 1] = sec
+    doc.saveas(path)
+    return expected
+
+def _run_pipeline(pipeline, path, tile_size=0, workers=1):
+    # 在 spawn 启动的独立子进程中运行，峰值内存只反映该流程本身（fork 子进程会继承父进程的内存峰值）
+    pipeline, mode = VARIANTS.get(pipeline, (pipeline, None))
+    if mode != 'tiled': tile_size, workers = 0, 1
+    if mode == 'cached':
+        import AutoSection
+        from AutoSectionCache import cache_path
+        if os.path.exists(cache_path(path)): os.remove(cache_path(path))
+        AutoSection.process_file(path)
+    t0 = time.perf_counter()
+    if pipeline == 'section':
+        import AutoSection
+        AutoSection.process_file(path, workers=workers, tile_size=tile_size, use_cache=mode == 'cached')
+        out = path.replace(".dxf", "_RESULT.dxf")
+    elif pipeline == 'drag':
+        import AutoSection_Drag
+        out = AutoSection_Drag.process_logic(path)[0]
+    elif pipeline == 'final':
+        import AutoSection_Final_Adaptive
+        AutoSection_Final_Adaptive.process_dxf_final(path, tile_size=tile_size, workers=workers)
+        out = path.replace(".dxf", "_算量自适应版.dxf")
+    else:
+        import AutoSectionReport
+        out = path.replace(".dxf", "_report.dxf")
+        AutoSectionReport.run_final_v1(path, out)
+    return time.perf_counter() - t0, peak_rss_mb(), out
+
+def hatch_area(path, layers):
+    # 输出图纸中指定图层全部填充的面积（外环减内环）
+    from shapely.geometry import Polygon
+    total = 0.0
+    for h in ezdxf.readfile(path).modelspace().query('HATCH'):
+        if h.dxf.layer not in layers: continue
+        rings = [Polygon([v[:2] for v in p.vertices]) for p in h.paths if hasattr(p, 'vertices')]
+        if rings: total += rings[0].area - sum(r.area for r in rings[1:])
+    return total
+
+def _synthetic_lines(doc):
+    # 合成图纸只含 LINE 与 LWPOLYLINE
+    from shapely.geometry import LineString
+    lines = []
+    for e in doc.modelspace().query('LINE LWPOLYLINE'):
+        pts = [tuple(e.dxf.start)[:2], tuple(e.dxf.end)[:2]] if e.dxftype() == 'LINE' else list(e.get_points('xy'))
+        lines.append(LineString(pts))
+    return lines
+
+def expected_hatch_area(path, pipeline):
+    # 按各流程的区域定义，由合成图纸原始线条直接求应得的填充面积：
+    # final 填充线网全部闭合面；drag/report 为线条加粗后剩余的区域（≥1）再回缩 0.05，report 另扣文字避让岛
+    import shapely
+    from shapely.ops import polygonize, unary_union
+    doc = ezdxf.readfile(path)
+    lines = _synthetic_lines(doc)
+    faces = list(polygonize(unary_union(lines)))
+    if pipeline == 'final': return sum(f.area for f in faces if f.area > 0.01)
+    if pipeline == 'drag': from AutoSection_Drag import WALL_WIDTH as wall
+    else: from AutoSectionReport import GAP_TOLERANCE as wall
+    walls = unary_union([l.buffer(wall, cap_style=2, join_style=2) for l in lines])
+    islands = None
+    if pipeline == 'report':
+        from AutoSectionReport import text_outline
+        rings = [rel + anchor for rel, anchor, _ in map(text_outline, doc.modelspace().query('TEXT MTEXT'))]
+        islands = unary_union([shapely.Polygon(r) for r in rings if r is not None])
+    total = 0.0
+    for r in shapely.get_parts(unary_union(faces).difference(walls)):
+        if r.area < 1.0: continue
+        r = r.buffer(-0.05, join_style=2)
+        total += (r.difference(islands) if islands is not None else r).area
+    return total
+
+def check_section_report(path, expected, tol=0.01):
+    # 逐断面逐地层核对 Sheet1 的设计/净超挖面积，返回 (最大绝对误差, 不符项数)
+    import pandas as pd
+    df = pd.read_excel(path.replace(".dxf", "_算量汇总.xlsx"), sheet_name='Sheet1')
+    got = {(int(r['断面'][1:]), r['地层']): (r['设计'], r['净超挖']) for _, r in df.iterrows()}
+    want = {(s, name): v for s, sec in expected.items() for name, v in sec.items()}
+    worst, bad = 0.0, len(set(got) ^ set(want))
+    for key in set(got) & set(want):
+        err = max(abs(g - w) for g, w in zip(got[key], want[key]))
+        worst = max(worst, err); bad += err > tol + 1e-4 * max(want[key])
+    return worst, bad
+
+def check_tiling(tile_size=30.0):
+    # 分块构面与整图构面逐面比对面积；含跨块且带内孔的面（100×10 矩形环内套半径 3 的圆岛）
+    from shapely.geometry import Point, box
+    from shapely.ops import polygonize
+    from AutoSectionTopo import node_lines, polygonize_tiled
+    cases = {'ring_island': [box(0, 0, 100, 10).exterior, Point(50, 5).buffer(3).exterior]}
+    bad = 0
+    for name, lines in cases.items():
+        want = sorted(round(f.area, 2) for f in polygonize(node_lines(lines)))
+        got = sorted(round(f.area, 2) for f in polygonize_tiled(lines, tile_size))
+        if got != want:
+            bad += 1
+            print(f"分块构面不一致 {name}: {got} != {want}", file=sys.stderr)
+    return bad
+
+def run_benchmark(sizes, pipelines, workdir, tile_size=150.0, workers=2, **gen_args):
+    os.makedirs(workdir, exist_ok=True)
+    results = [{'pipeline': 'tiling', 'mismatches': check_tiling()}]
+    print(json.dumps(results[0], ensure_ascii=False), flush=True)
+    for n in sizes:
+        for pipeline in pipelines:
+            path = os.path.join(workdir, f"synthetic_{n}_{pipeline}.dxf")
+            expected = make_synthetic_dxf(path, sections=n, **gen_args)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                sec, peak, out = pool.submit(_run_pipeline, pipeline, path, tile_size, workers).result()
+            base = VARIANTS.get(pipeline, (pipeline,))[0]
+            rec = {'sections': n, 'pipeline': pipeline, 'seconds': round(sec, 3), 'peak_mb': round(peak, 1) if peak else None}
+            if base == 'section':
+                rec['expected_area'] = round(sum(d + o for s in expected.values() for d, o in s.values()), 3)
+                rec['max_error'], rec['mismatches'] = check_section_report(path, expected)
+                rec['max_error'] = round(rec['max_error'], 4)
+            else:
+                # 填充面积与该流程自身的应得面积比对（边界简化受 --area-error 约束，留 0.1% 余量）
+                want = expected_hatch_area(path, base)
+                layer = {'drag': 'AA_填充层', 'final': 'AA_填充算量层', 'report': 'AA_HATCH'}[base]
+                got = hatch_area(out, {layer})
+                rec['expected_area'], rec['hatch_area'], rec['area_diff'] = round(want, 3), round(got, 3), round(got - want, 3)
+                rec['mismatches'] = int(abs(got - want) > max(0.01, 1e-3 * want))
+            results.append(rec)
+            print(json.dumps(rec, ensure_ascii=False), flush=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合成断面生成与四条流程的基准测试")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("gen", "run"):
+        p = sub.add_parser(name)
+        p.add_argument("--geo-layers", type=int, default=3, help="地质分层线条数")
+        p.add_argument("--density", type=int, default=1, help="每条边的顶点加密倍数")
+        p.add_argument("--gap", type=float, default=0.0, help="设计线底边缺口宽度")
+        p.add_argument("--texts", type=int, default=1, help="每个地层的文字数量")
+        p.add_argument("--seed", type=int, default=0)
+    sub.choices["gen"].add_argument("output")
+    sub.choices["gen"].add_argument("--sections", type=int, default=20)
+    sub.choices["run"].add_argument("--sizes", default="10,50,200", help="断面数量，逗号分隔")
+    sub.choices["run"].add_argument("--pipelines", default=",".join(PIPELINES))
+    sub.choices["run"].add_argument("--workdir", default="bench_out")
+    sub.choices["run"].add_argument("--tile-size", type=float, default=150.0, help="*_tiled 变体的分块边长")
+    sub.choices["run"].add_argument("--workers", type=int, default=2, help="*_tiled 变体的并行进程数")
+    sub.choices["run"].add_argument("--json", help="结果另存为 JSON")
+    args = parser.parse_args()
+
+    gen_args = dict(geo_layers=args.geo_layers, density=args.density, gap=args.gap, texts=args.texts, seed=args.seed)
+    if args.cmd == "gen":
+        expected = make_synthetic_dxf(args.output, sections=args.sections, **gen_args)
+        print(f"已生成 {args.output}：{len(expected)} 个断面")
+    else:
+        results = run_benchmark([int(n) for n in args.sizes.split(",")], args.pipelines.split(","), args.workdir,
+                                tile_size=args.tile_size, workers=args.workers, **gen_args)
+        failed = [r for r in results if r.get('mismatches')]
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, ensure_ascii=False, indent=2)
+        sys.exit(1 if failed else 0)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# ================= 增量计算缓存 =================
+# 以断面/分块输入几何的内容哈希为键，把计算结果存入 DXF 旁的 SQLite 文件；
+# 图纸改版后只有几何变化的断面需要重算。按总大小淘汰最久未用的条目。
+# 值一律存为 JSON（几何用十六进制 WKB），不用 pickle：缓存文件放在可被他人写入的投放目录时，读取它也不会执行代码
+# ===============================================
+
+CACHE_MAX_MB = 256
+CACHE_VERSION = 2  # 计算内核逻辑或存储格式变化时递增，使旧缓存全部失效
+
+def cache_path(input_path):
+    return os.path.splitext(input_path)[0] + "_cache.sqlite"
+
+def digest(*parts):
+    # 内容哈希：bytes 直接写入，数组/列表逐项展开，其余对象取 repr
+    h = hashlib.sha1(repr(CACHE_VERSION).encode())
+    def feed(p):
+        if isinstance(p, (bytes, bytearray)): h.update(p)
+        elif hasattr(p, 'tobytes') and getattr(p, 'dtype', None) != object: h.update(p.tobytes())
+        elif isinstance(p, (list, tuple)) or hasattr(p, 'tolist'):
+            h.update(b'[')
+            for x in p: feed(x)
+            h.update(b']')
+        else: h.update(repr(p).encode())
+        h.update(b'|')
+    for p in parts: feed(p)
+    return h.hexdigest()
+
+class SectionCache:
+    def __init__(self, path, max_mb=CACHE_MAX_MB):
+        self.path, self.max_bytes = path, int(max_mb * 1024 * 1024)
+        self.hits = self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, used REAL)")
+
+    def get(self, key):
+        row = self.db.execute("SELECT value FROM entries WHERE key=?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1; return None
+        try: value = json.loads(row[0])
+        except (TypeError, ValueError):
+            self.misses += 1; return None  # 旧版本或损坏的条目按未命中处理
+        self.hits += 1
+        self.db.execute("UPDATE entries SET used=? WHERE key=?", (time.time(), key))
+        return value
+
+    def put(self, key, value):
+        # value 只能含 JSON 基本类型（字符串/数字/列表/字典），几何先转十六进制 WKB
+        text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, text, len(text.encode()), time.time()))
+
+    def evict(self):
+        # 超出容量时按最近使用时间从旧到新删除
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes: return 0
+        removed = 0
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+            if total <= self.max_bytes: break
+            self.db.execute("DELETE FROM entries WHERE key=?", (key,))
+            total -= size; removed += 1
+        return removed
+
+    def close(self):
+        removed = self.evict()
+        self.db.commit()
+        if removed: self.db.execute("VACUUM")
+        self.db.close()
\ No newline at end of file
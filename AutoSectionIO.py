@@ -0,0 +1,149 @@
+import math
+import numpy as np
+import shapely
+from collections import defaultdict
+from AutoSectionCache import digest
+
+# ================= DXF 单次提取模块 =================
+# 一次遍历模型空间，按图层收集线坐标数组与文字记录，供填充与算量各阶段复用；
+# 可选 iterdxf 流式读取，超大测量图无需整图载入内存；
+# ARC / 多段线凸度 / SPLINE 按弦高误差离散（缓弧少点、急弯多点），结果按句柄+内容签名缓存
+# ===================================================
+
+LINE_TYPES = ('LINE', 'LWPOLYLINE', 'POLYLINE', 'ARC', 'SPLINE')
+TEXT_TYPES = ('TEXT', 'MTEXT')
+CHORD_TOLERANCE = 0.001  # 曲线离散的最大弦高误差（图纸单位）
+CURVE_CACHE_MAX = 200000  # 进程内曲线离散缓存条目上限，常驻进程/监视服务重复处理时复用
+
+_CURVES = {}  # "句柄:内容签名哈希" -> 离散坐标，签名含弦高误差
+_CURVE_STATS = {'hits': 0, 'misses': 0}
+_curves_used = None  # read_dxf 带缓存时记录本次用到的条目，写回时顺带淘汰已失效的签名
+
+def _to_wcs(ent, pts):
+    # 多段线坐标位于 OCS，拉伸方向非 +Z（镜像图元常见 0,0,-1）时换算到 WCS
+    ext = ent.dxf.get('extrusion')
+    if ext is None or tuple(ext) == (0, 0, 1): return pts
+    return [(v.x, v.y) for v in ent.ocs().points_to_wcs((x, y, 0) for x, y in pts)]
+
+def bulge_points(xyb, closed, tol=CHORD_TOLERANCE):
+    # 凸度段展开为圆弧点，段数由半径与圆心角按弦高误差确定；端点保持原顶点不变
+    from ezdxf.math import arc_segment_count, bulge_to_arc
+    if closed and len(xyb) > 1 and xyb[0][:2] != xyb[-1][:2]: xyb = list(xyb) + [(xyb[0][0], xyb[0][1], 0.0)]
+    out = [xyb[0][:2]] if xyb else []
+    for (x0, y0, b), (x1, y1, _) in zip(xyb, xyb[1:]):
+        if b and (x0, y0) != (x1, y1):
+            (cx, cy), a0, a1, r = bulge_to_arc((x0, y0), (x1, y1), b)
+            sweep = (a1 - a0) % (2 * math.pi)
+            n = max(1, arc_segment_count(r, sweep, tol))
+            arc = [(cx + r * math.cos(a0 + sweep * k / n), cy + r * math.sin(a0 + sweep * k / n)) for k in range(1, n)]
+            out += arc[::-1] if b < 0 else arc  # bulge_to_arc 总按逆时针返回，负凸度反向
+        out.append((x1, y1))
+    return out
+
+def _xyb(ent, t):
+    if t == 'LWPOLYLINE': return [tuple(map(float, p)) for p in ent.get_points('xyb')], ent.closed
+    return [(v.dxf.location.x, v.dxf.location.y, v.dxf.bulge) for v in ent.vertices], ent.is_closed
+
+def _curve_signature(ent, t, poly=None):
+    # 决定离散结果的全部定义数据，图元改动后签名随之变化；poly 为已读出的多段线 (顶点+凸度, 闭合)
+    d = ent.dxf
+    if t == 'ARC': data = (tuple(d.center), d.radius, d.start_angle, d.end_angle, tuple(d.extrusion))
+    elif t == 'SPLINE':
+        data = (d.degree, d.flags, tuple(map(tuple, ent.control_points)), tuple(ent.knots), tuple(ent.weights), tuple(map(tuple, ent.fit_points)))
+    else:
+        xyb, closed = poly
+        data = (tuple(xyb), closed, tuple(d.extrusion))
+    return (t, CHORD_TOLERANCE) + data
+
+def _flatten(ent, t, poly=None):
+    if t == 'ARC': return [(v.x, v.y) for v in ent.flattening(CHORD_TOLERANCE)]  # ARC 自带 OCS 换算
+    if t == 'SPLINE': return [(v.x, v.y) for v in ent.flattening(CHORD_TOLERANCE, segments=2)]
+    return _to_wcs(ent, bulge_points(*poly))
+
+def curve_coords(ent, t, poly=None):
+    # 曲线离散带缓存：同一句柄且内容签名一致时直接复用；多段线顶点由调用方读出一次后传入
+    handle = ent.dxf.get('handle')
+    key = f"{handle}:{digest(_curve_signature(ent, t, poly))}" if handle else None  # 字符串键，可直接存入 JSON 缓存
+    pts = _CURVES.get(key) if key else None
+    if pts is None:
+        pts = _flatten(ent, t, poly)
+        _CURVE_STATS['misses'] += 1
+        if key:
+            if len(_CURVES) >= CURVE_CACHE_MAX: _CURVES.clear()
+            _CURVES[key] = pts
+    else: _CURVE_STATS['hits'] += 1
+    if key and _curves_used is not None: _curves_used[key] = pts
+    return pts
+
+def entity_coords(ent):
+    t = ent.dxftype()
+    if t == 'LINE':
+        s, e = ent.dxf.start, ent.dxf.end
+        return [(s.x, s.y), (e.x, e.y)]
+    if t in ('ARC', 'SPLINE'): return curve_coords(ent, t)
+    if t == 'LWPOLYLINE' or (t == 'POLYLINE' and ent.is_2d_polyline):
+        poly = _xyb(ent, t)  # 顶点只读一次，签名与离散共用
+        if any(p[2] for p in poly[0]): return curve_coords(ent, t, poly)
+        pts, closed = [p[:2] for p in poly[0]], poly[1]
+    elif t == 'POLYLINE':
+        pts, closed = [(v.dxf.location.x, v.dxf.location.y) for v in ent.vertices], ent.is_closed
+    else: return []
+    # 闭合标志的多段线补上闭合边，否则首尾之间缺一段，区域无法闭合
+    if closed and len(pts) > 2 and pts[0] != pts[-1]: pts.append(pts[0])
+    return _to_wcs(ent, pts) if t == 'LWPOLYLINE' or ent.is_2d_polyline else pts
+
+def load_curves(cache):
+    # 从 DXF 旁的增量缓存载入上次运行的曲线离散结果，并开始记录本次用到的条目
+    global _curves_used
+    _CURVE_STATS.update(hits=0, misses=0)
+    if not cache: return
+    _CURVES.update(cache.get(digest('curves', CHORD_TOLERANCE)) or {})
+    _curves_used = {}
+
+def save_curves(cache):
+    # 只写回本次用到的条目：图元改动后旧签名自然淘汰；无新离散时不改写
+    global _curves_used
+    used, _curves_used = _curves_used, None
+    if cache and used is not None and _CURVE_STATS['misses']: cache.put(digest('curves', CHORD_TOLERANCE), used)
+
+def entity_text(ent):
+    return ent.dxf.text if ent.dxftype() == 'TEXT' else ent.text
+
+def extract_layers(entities, layers=None):
+    # 单次遍历：lines[图层] = [(n,2) 坐标数组]，texts[图层] = [(x, y, 原始文字)]
+    lines, texts = defaultdict(list), defaultdict(list)
+    for ent in entities:
+        ly = ent.dxf.get('layer', '0')
+        if layers is not None and ly not in layers: continue
+        t = ent.dxftype()
+        if t in LINE_TYPES:
+            pts = entity_coords(ent)
+            if len(pts) >= 2: lines[ly].append(np.array(pts, dtype=float))
+        elif t in TEXT_TYPES:
+            ins = ent.dxf.insert
+            texts[ly].append((ins.x, ins.y, entity_text(ent)))
+    return {'lines': lines, 'texts': texts, 'geoms': {}}
+
+def layer_lines(data, layer):
+    # 按图层惰性构造 LineString，每层只转换一次（保持原始坐标，吸附只在打断时进行）
+    if layer not in data['geoms']:
+        coords = data['lines'].get(layer, [])
+        if coords:
+            idx = np.repeat(np.arange(len(coords)), [len(c) for c in coords])
+            data['geoms'][layer] = list(shapely.linestrings(np.concatenate(coords), indices=idx))
+        else: data['geoms'][layer] = []
+    return data['geoms'][layer]
+
+def read_dxf(path, layers=None, streaming=False, cache=None):
+    # 返回 (doc, data)；流式模式下 doc 为 None，仅供计算使用。传入 cache 时曲线离散结果跨次复用
+    load_curves(cache)
+    if streaming:
+        from ezdxf.addons import iterdxf
+        doc, data = None, extract_layers(iterdxf.modelspace(path), layers)
+    else:
+        import ezdxf  # 延迟导入：ezdxf 加载较慢，仅在真正读图时才需要
+        doc = ezdxf.readfile(path)
+        data = extract_layers(doc.modelspace(), layers)
+    data['curves'] = (_CURVE_STATS['hits'], _CURVE_STATS['misses'])
+    save_curves(cache)
+    return doc, data
\ No newline at end of file
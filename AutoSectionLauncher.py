@@ -0,0 +1,177 @@
+import getpass
+import multiprocessing
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing.connection import Client, Listener
+
+# ================= 启动器与常驻进程 =================
+# 只依赖标准库：--resident 时先尝试把文件列表交给已预热的常驻进程（Windows 命名管道 /
+# POSIX Unix 套接字），无常驻进程则本地处理并在后台拉起一个，空闲超时后自动退出。
+# 打包 EXE 时以本文件为入口，交接路径不加载 numpy/shapely/ezdxf/openpyxl；本地处理时打印模块加载耗时
+# ===================================================
+
+TOOLS = {'section': 'AutoSection', 'drag': 'AutoSection_Drag', 'final': 'AutoSection_Final_Adaptive'}
+RESIDENT_IDLE = 600  # 常驻进程空闲多少秒后退出
+
+def _load(tool):
+    # 显式导入，便于 pyinstaller 静态收集依赖
+    if tool == 'section': import AutoSection as m
+    elif tool == 'drag': import AutoSection_Drag as m
+    else: import AutoSection_Final_Adaptive as m
+    return m
+
+def _paths(tool):
+    # 每个用户、每个工具一个通道；认证密钥文件仅本人可读
+    user = re.sub(r'\W', '_', getpass.getuser())
+    base = os.path.join(tempfile.gettempdir(), f"AutoSection_{tool}_{user}")
+    address = rf"\\.\pipe\AutoSection_{tool}_{user}" if sys.platform == 'win32' else base + ".sock"
+    return address, base + ".key"
+
+def _stamp(tool):
+    # 代码版本戳：EXE 或工具脚本的修改时间，常驻进程与本次启动不一致时不交接
+    path = sys.executable if getattr(sys, 'frozen', False) else os.path.join(os.path.dirname(os.path.abspath(__file__)), TOOLS[tool] + ".py")
+    try: return os.path.getmtime(path)
+    except OSError: return None
+
+def _connect(tool):
+    address, key_file = _paths(tool)
+    try:
+        with open(key_file, 'rb') as f: key = f.read()
+        return Client(address, authkey=key)
+    except Exception: return None
+
+def _handoff(tool, argv):
+    # 交给常驻进程处理并转发其输出；返回退出码，无可用常驻进程时返回 None
+    conn = _connect(tool)
+    if conn is None: return None
+    with conn:
+        conn.send({'argv': argv, 'cwd': os.getcwd(), 'stamp': _stamp(tool)})
+        while True:
+            try: kind, val = conn.recv()
+            except (EOFError, OSError):
+                print("\n[常驻] 常驻进程意外退出"); return 1
+            if kind == 'out': sys.stdout.write(val); sys.stdout.flush()
+            elif kind == 'stale': return None
+            else: return val
+
+def _spawn(tool, idle):
+    # 后台拉起常驻进程（脱离当前控制台），本次仍在本地处理
+    cmd = [sys.executable] if getattr(sys, 'frozen', False) else [sys.executable, os.path.abspath(__file__)]
+    cmd += ['--serve', '--tool', tool, '--idle', str(idle)]
+    kw = {'creationflags': 0x00000008 | 0x00000200} if sys.platform == 'win32' else {'start_new_session': True}
+    try: subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True, **kw)
+    except OSError as e: print(f"[常驻] 无法启动常驻进程: {e}")
+
+class _ConnWriter:
+    # 把常驻进程中的 print 输出转发给客户端；客户端断开后静默丢弃
+    def __init__(self, conn): self.conn, self.alive = conn, True
+    def write(self, s):
+        if s and self.alive:
+            try: self.conn.send(('out', s))
+            except OSError: self.alive = False
+        return len(s)
+    def flush(self): pass
+
+def serve(tool, idle=RESIDENT_IDLE):
+    conn = _connect(tool)
+    if conn is not None:
+        conn.close(); return 0  # 已有常驻进程
+    module, stamp = _load(tool), _stamp(tool)  # 预热：重量级依赖在此一次性加载
+    address, key_file = _paths(tool)
+    if sys.platform != 'win32' and os.path.exists(address): os.unlink(address)
+    key = os.urandom(32)
+    fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f: f.write(key)
+    listener, conns = Listener(address, authkey=key), queue.Queue()
+
+    def accept():
+        while True:
+            try: conns.put(listener.accept())
+            except OSError: return
+            except Exception: continue  # 认证失败等，忽略该连接
+
+    threading.Thread(target=accept, daemon=True).start()
+    try:
+        while True:
+            try: conn = conns.get(timeout=idle)
+            except queue.Empty: break
+            with conn:
+                try: req = conn.recv()
+                except (EOFError, OSError): continue
+                if req.get('stamp') != stamp:
+                    listener.close(); conn.send(('stale', None)); break
+                out = _ConnWriter(conn)
+                try:
+                    os.chdir(req['cwd'])
+                    with redirect_stdout(out), redirect_stderr(out):
+                        print("[常驻] 由常驻进程处理（已预热，跳过模块加载）")
+                        code = module.main(req['argv'] + ['--no-pause'])
+                except SystemExit as e: code = e.code
+                except Exception:
+                    out.write(traceback.format_exc()); code = 1
+                try: conn.send(('exit', code or 0))
+                except OSError: pass
+    finally:
+        listener.close()
+        try: os.unlink(key_file)
+        except OSError: pass
+    return 0
+
+def _local_main(tool, main, load_s):
+    # 本地处理前取得 main 并返回模块加载耗时：由本文件启动时在此导入并计时，
+    # 由入口脚本启动时为其顶层导入耗时（入口传入的 t0 到 launch 被调用）
+    if main is None:
+        t0 = time.perf_counter()
+        main = _load(tool).main
+        load_s = time.perf_counter() - t0
+    return main, load_s
+
+def launch(tool, argv, main=None, t0=None):
+    # 各入口的统一启动：无 --resident/--serve 时直接调用 main(argv)，行为与原先一致；
+    # 本地处理时都报告模块加载耗时，t0 为入口脚本开始导入时的 perf_counter
+    load_s = time.perf_counter() - t0 if main is not None and t0 is not None else None
+    argv, idle = list(argv), RESIDENT_IDLE
+    for opt in ('--idle', '--tool'):
+        if opt in argv:
+            i = argv.index(opt)
+            if opt == '--idle': idle = float(argv[i + 1])
+            else: tool = argv[i + 1]
+            del argv[i:i + 2]
+    if '--serve' in argv: return serve(tool, idle)
+    if '--resident' not in argv:
+        main, load_s = _local_main(tool, main, load_s)
+        if load_s is not None: print(f"[启动] 模块加载 {load_s:.2f}s")
+        return main(argv)
+
+    argv.remove('--resident')
+    no_pause = '--no-pause' in argv
+    if not argv:
+        path = input("请拖入或输入DXF文件路径: ").strip('"')
+        argv = [path] if path else []
+    t0 = time.perf_counter()
+    code = _handoff(tool, argv)
+    if code is None:
+        _spawn(tool, idle)
+        main, load_s = _local_main(tool, main, load_s)
+        if load_s is not None: print(f"[启动] 模块加载 {load_s:.2f}s（下次启动将交给常驻进程）")
+        code = main(argv + ['--no-pause'])
+    else: print(f"[常驻] 交接往返 {time.perf_counter() - t0:.2f}s")
+    if not no_pause: input("\n任务完成，按回车键退出...")
+    return code
+
+if __name__ == "__main__":
+    # python AutoSectionLauncher.py section|drag|final [--resident] [--idle 秒] 文件...
+    multiprocessing.freeze_support()
+    args = sys.argv[1:]
+    tool = args.pop(0) if args and args[0] in TOOLS else None
+    if tool is None and '--tool' not in args:
+        print(f"用法: AutoSectionLauncher.py {{{'|'.join(TOOLS)}}} [--resident] [--idle 秒] 文件..."); sys.exit(2)
+    sys.exit(launch(tool, args))
\ No newline at end of file
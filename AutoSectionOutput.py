@@ -0,0 +1,108 @@
+# ================= DXF 输出模块 =================
+# 叠加图输出：只写生成的填充与调试图层，不再整图另存原始测量线；
+# 批量填充：按 (图案, 比例) 缓存缩放后的图案定义，逐区域只写边界；
+# 边界顶点预算：保持拓扑简化，单区域面积相对误差超限即不再简化，保证方量不变
+# ===============================================
+import os
+import shapely
+
+OVERLAY_SUFFIX = "_overlay.dxf"
+OVERLAY_HEADER = ('$INSUNITS', '$MEASUREMENT', '$LUNITS', '$LUPREC', '$AUNITS')
+AREA_ERROR = 1e-4  # 简化后单个区域面积的相对误差上限（0.01%）
+
+def overlay_path(output_path):
+    return os.path.splitext(output_path)[0] + OVERLAY_SUFFIX
+
+def new_overlay(src_doc=None):
+    # 叠加图与原图共用世界坐标：单位/测量制式照抄原图，插入基点固定为 0,0，
+    # 以外部参照或块插入到原图 0,0、比例 1 即完全重合
+    import ezdxf  # 与读图一致延迟导入
+    version = src_doc.dxfversion if src_doc is not None else 'AC1024'
+    doc = ezdxf.new(max(version, 'AC1015'))  # R12 不支持 HATCH
+    if src_doc is not None:
+        for var in OVERLAY_HEADER:
+            if var in src_doc.header: doc.header[var] = src_doc.header[var]
+    doc.header['$INSBASE'] = (0, 0, 0)
+    return doc
+
+def add_hatch_arguments(parser, simplify=0.0):
+    parser.add_argument("--simplify", type=float, default=simplify, help=f"填充边界简化容差（图纸单位），0 为不简化，默认 {simplify}")
+    parser.add_argument("--vertex-budget", type=int, default=0, help="单个填充边界顶点数上限，超出时逐步放大容差，0 为不限")
+    parser.add_argument("--area-error", type=float, default=AREA_ERROR, help=f"简化允许的单区域面积相对误差，默认 {AREA_ERROR}")
+    return parser
+
+def hatch_options(args):
+    return {'simplify': args.simplify, 'vertex_budget': args.vertex_budget, 'area_error': args.area_error}
+
+def ring_vertices(poly):
+    # 写入 DXF 的顶点数（各环去掉重复的闭合点）
+    return int(shapely.get_num_coordinates(poly)) - 1 - int(shapely.get_num_interior_rings(poly))
+
+def simplify_region(poly, tolerance=0.0, budget=0, max_error=AREA_ERROR):
+    # 先按容差简化：面积误差超限则容差逐次减半，取误差限内最大的容差；仍超出顶点预算则容差逐次加倍，
+    # 直到满足预算或面积误差超限（退回上一档）。返回 (简化结果, 是否受面积误差限制)
+    if poly.geom_type != 'Polygon' or poly.is_empty or not (tolerance or budget and ring_vertices(poly) > budget): return poly, False
+    area, best, limited = poly.area, poly, False
+    x1, y1, x2, y2 = poly.bounds
+    diag = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+    tol = tolerance or diag * 1e-5
+    for _ in range(32):
+        cand = poly.simplify(tol, preserve_topology=True)
+        if cand.geom_type == 'Polygon' and not cand.is_empty and abs(cand.area - area) <= max_error * area:
+            best = cand
+            if limited or not budget or ring_vertices(best) <= budget or tol >= diag: break
+            tol *= 2
+        else:
+            limited = True
+            if best is not poly: break
+            tol /= 2
+    return best, limited
+
+class HatchWriter:
+    # 与 set_pattern_fill 结果一致（同一缩放函数），但每种 (图案, 比例) 只缩放一次
+    def __init__(self, doc, layer, color=7, simplify=0.0, vertex_budget=0, area_error=AREA_ERROR):
+        from ezdxf.tools import pattern
+        if layer not in doc.layers: doc.layers.add(layer, color=color)
+        self.msp, self.layer, self.count, self.scaled = doc.modelspace(), layer, 0, {}
+        self.tolerance, self.budget, self.max_error = simplify, vertex_budget, area_error
+        self.vertices_in = self.vertices_out = self.limited = 0
+        self.worst_error = 0.0
+        self.scale_pattern = pattern.scale_pattern
+        self.predefined = pattern.ISO_PATTERN if doc.header.get('$MEASUREMENT', 1) else pattern.IMPERIAL_PATTERN
+
+    def definition(self, name, scale):
+        key = (name, scale)
+        if key not in self.scaled:
+            lines = self.predefined.get(name, self.predefined['ANSI31'])
+            self.scaled[key] = self.scale_pattern(lines, factor=scale) if scale != 1 else lines
+        return self.scaled[key]
+
+    def simplify(self, poly):
+        # 按顶点预算简化并累计前后顶点数
+        if poly.geom_type != 'Polygon' or poly.is_empty: return poly  # 回缩后断开的区域由调用方跳过，不计入统计
+        out, limited = simplify_region(poly, self.tolerance, self.budget, self.max_error)
+        self.vertices_in += ring_vertices(poly); self.vertices_out += ring_vertices(out)
+        self.limited += limited
+        if poly.area: self.worst_error = max(self.worst_error, abs(out.area - poly.area) / poly.area)
+        return out
+
+    def add_polygon(self, poly, name, scale, rgb):
+        poly = self.simplify(poly)
+        return self.add([list(poly.exterior.coords)[:-1]] + [list(r.coords)[:-1] for r in poly.interiors], name, scale, rgb)
+
+    def summary(self):
+        saved = 1 - self.vertices_out / self.vertices_in if self.vertices_in else 0.0
+        msg = f"填充边界顶点 {self.vertices_in} -> {self.vertices_out}（减少 {saved:.1%}），最大面积误差 {self.worst_error:.2e}"
+        return msg + (f"，{self.limited} 个区域受面积误差限制" if self.limited else "")
+
+    def add(self, paths, name, scale, rgb):
+        # paths：闭合边界坐标列表（首个为外环，其余为孔/岛）
+        # add_hatch 会把填充重置为 SOLID，图案属性需在创建后设置
+        h = self.msp.add_hatch(color=7, dxfattribs={'layer': self.layer})
+        d = h.dxf
+        d.solid_fill, d.pattern_name, d.pattern_scale, d.pattern_angle, d.pattern_double, d.hatch_style, d.pattern_type = 0, name, float(scale), 0.0, 0, 1, 1
+        h.set_pattern_definition(self.definition(name, float(scale)))
+        h.rgb = rgb
+        for p in paths: h.paths.add_polyline_path(p, is_closed=True)
+        self.count += 1
+        return h
\ No newline at end of file
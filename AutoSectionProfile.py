@@ -0,0 +1,86 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+# ================= 分阶段性能剖析 =================
+# --profile 时记录各阶段墙钟/CPU 时间、峰值内存、实体与面数量及逐断面耗时，
+# 在输出文件旁写出 _profile.json / _profile.csv；关闭时为空操作，生产环境可常驻
+# =================================================
+
+def peak_rss_mb():
+    # 进程峰值常驻内存（MB）；Linux 取 /proc 的 VmHWM（ru_maxrss 跨 fork/exec 继承父进程峰值，
+    # spawn 子进程也会报出父进程的内存），macOS 用 resource，Windows 用 psapi
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'): return int(line.split()[1]) / 1024
+    except OSError: pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+    except ImportError: pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+        class PMC(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        pmc = PMC(); pmc.cb = ctypes.sizeof(PMC)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(pmc), pmc.cb)
+        return pmc.PeakWorkingSetSize / 1024 / 1024
+    except Exception: return None
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, name):
+        self.name, self.stages, self.sections = name, [], []
+
+    @contextmanager
+    def stage(self, name):
+        # 阶段计时；yield 出的字典可追加该阶段的计数（实体数、面数等）
+        rec = {}
+        w0, c0 = time.perf_counter(), time.process_time()
+        try: yield rec
+        finally:
+            peak = peak_rss_mb()
+            self.stages.append({'stage': name, 'wall_s': round(time.perf_counter() - w0, 4), 'cpu_s': round(time.process_time() - c0, 4),
+                                'peak_rss_mb': round(peak, 1) if peak else None, **rec})
+
+    def section(self, idx, station, seconds):
+        self.sections.append({'section': f'S{idx}', 'station': station, 'wall_s': round(seconds, 4)})
+
+    def slowest(self, n=10):
+        return sorted(self.sections, key=lambda r: r['wall_s'], reverse=True)[:n]
+
+    def write(self, base_path):
+        # 写出 <base>_profile.json（完整）与 <base>_profile.csv（阶段 + 逐断面）
+        report = {'file': self.name, 'stages': self.stages, 'slowest_sections': self.slowest(), 'sections': self.sections}
+        with open(base_path + "_profile.json", "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(base_path + "_profile.csv", "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(['kind', 'name', 'station', 'wall_s', 'cpu_s', 'peak_rss_mb'])
+            for s in self.stages: w.writerow(['stage', s['stage'], '', s['wall_s'], s['cpu_s'], s['peak_rss_mb']])
+            for s in self.sections: w.writerow(['section', s['section'], s['station'], s['wall_s'], '', ''])
+        print("  [profile] " + "  ".join(f"{s['stage']} {s['wall_s']:.2f}s" for s in self.stages))
+        if self.sections:
+            print("  [profile] 最慢断面: " + ", ".join(f"{s['section']}({s['station']}) {s['wall_s']:.3f}s" for s in self.slowest(5)))
+
+class _NullProfiler:
+    # 关闭剖析时的空实现：所有调用都是常数开销
+    enabled = False
+    _stage = nullcontext({})
+
+    def stage(self, name): return self._stage
+    def section(self, idx, station, seconds): pass
+    def write(self, base_path): pass
+
+NULL_PROFILER = _NullProfiler()
+
+def make_profiler(enabled, name=""):
+    return Profiler(name) if enabled else NULL_PROFILER
\ No newline at end of file
@@ -1,15 +1,28 @@
-import ezdxf
+import argparse
 import math
+import multiprocessing
+import os
+import sys
+import numpy as np
+import shapely
+from shapely import STRtree
 from shapely.geometry import LineString, MultiPolygon, Polygon, box, Point
 from shapely.ops import unary_union
+from AutoSectionBatch import add_batch_arguments, expand_inputs, run_batch, pause
+from AutoSectionIO import LINE_TYPES, entity_coords
+from AutoSectionProfile import make_profiler
+from AutoSectionOutput import AREA_ERROR, HatchWriter, add_hatch_arguments, hatch_options, new_overlay, overlay_path
 
 # ================= 参数设置 =================
 INPUT_DXF = "t.dxf"
 OUTPUT_DXF = "AutoSection_Final_v1.dxf"
+OUTPUT_SUFFIX = "_Final_v1.dxf"  # 命令行批量处理时的输出文件后缀
 
 GAP_TOLERANCE = 0.2 
 SPARSITY_FACTOR = 0.2 
 TEXT_OFFSET = 1.0  # 文字避让的边缘外扩距离
+SIMPLIFY = 0.01  # 填充边界简化容差（受面积误差上限约束）
+TEXT_CACHE_MAX = 100000  # 文字外框缓存条目上限
 
 RGB_COLORS = [
     (255, 150, 150), (150, 255, 150), (150, 150, 255),
@@ -17,99 +30,154 @@ RGB_COLORS = [
 ]
 CLEAN_PATTERNS = ['ANSI31', 'ANSI32', 'ANSI33']
 
-def run_final_v1():
+# 文字避让框缓存：外框形状只取决于字体、字高、宽度因子、内容与对齐/旋转，与位置无关，
+# 按这些属性缓存相对定位点、已外扩 TEXT_OFFSET 的顶点，同样的标注只做一次字体测量
+_TEXT_OUTLINES = {}
+
+def _text_key(ent):
+    from ezdxf.entities import get_font_name
+    d = ent.dxf
+    if ent.dxftype() == 'TEXT':
+        _, p1, p2 = ent.get_placement()
+        span = tuple(p2 - p1) if p2 is not None and d.halign > 2 else None  # 布满/对齐文字的宽度由两点距离决定
+        key = ('TEXT', get_font_name(ent), d.height, d.width, d.text, d.rotation, d.halign, d.valign, d.oblique,
+               d.text_generation_flag, tuple(d.extrusion), span)
+        return key, ent.ocs().to_wcs(p1)
+    key = ('MTEXT', get_font_name(ent), d.char_height, d.get('width'), ent.text, d.line_spacing_factor, d.attachment_point,
+           d.get('rotation'), tuple(d.get('text_direction', (1, 0, 0))), tuple(d.extrusion))
+    return key, d.insert
+
+def text_outline(ent):
+    # ezdxf 按实际字体度量的文字外框（含对齐、旋转），直角外扩 TEXT_OFFSET（水平文字即外扩后的矩形）；
+    # 返回 (相对定位点的顶点数组, 定位点, 是否命中缓存)，空文字顶点为 None
+    key, anchor = _text_key(ent)
+    hit = key in _TEXT_OUTLINES
+    if not hit:
+        from ezdxf import disassemble
+        verts = [(v.x - anchor.x, v.y - anchor.y) for v in disassemble.make_primitive(ent).vertices()]
+        rel = shapely.get_coordinates(Polygon(verts).buffer(TEXT_OFFSET, join_style=2).exterior) if len(verts) >= 3 else None
+        if len(_TEXT_OUTLINES) >= TEXT_CACHE_MAX: _TEXT_OUTLINES.clear()
+        _TEXT_OUTLINES[key] = rel
+    return _TEXT_OUTLINES[key], (anchor.x, anchor.y), hit
+
+def run_final_v1(input_dxf=None, output_dxf=None, profile=False, overlay=False, simplify=SIMPLIFY, vertex_budget=0, area_error=AREA_ERROR):
+    # 不传路径时沿用上方 INPUT_DXF / OUTPUT_DXF；只传输入时输出为 <输入>_Final_v1.dxf
+    if input_dxf is None: input_dxf, output_dxf = INPUT_DXF, output_dxf or OUTPUT_DXF
+    output_dxf = output_dxf or os.path.splitext(input_dxf)[0] + OUTPUT_SUFFIX
     print("1. 正在读取并分析图纸...")
+    prof = make_profiler(profile, input_dxf)
     try:
-        doc = ezdxf.readfile(INPUT_DXF)
-        msp = doc.modelspace()
+        with prof.stage('read'):
+            import ezdxf  # 与其余入口一致延迟导入
+            doc = ezdxf.readfile(input_dxf)
+            msp = doc.modelspace()
     except Exception as e:
-        print(f"读取失败: {e}"); return
+        print(f"读取失败: {e}"); return False
 
     raw_geoms = []
-    text_boxes = [] # 用于存储文字的避让矩形
+    text_rings = [] # 用于存储文字的避让框顶点
+    text_hits = 0
     min_x, min_y, max_x, max_y = float('inf'), float('inf'), float('-inf'), float('-inf')
 
-    for ent in msp:
-        # A. 提取线条
-        if ent.dxftype() in ('LINE', 'LWPOLYLINE', 'POLYLINE'):
-            try:
-                if ent.dxftype() == 'LINE':
-                    geom = LineString([ent.dxf.start.vec2, ent.dxf.end.vec2])
-                else:
-                    pts = [p[:2] for p in ent.get_points()] if ent.dxftype() == 'LWPOLYLINE' else [p.vtx.vec2 for p in ent.vertices]
+    with prof.stage('extract') as st:
+        for ent in msp:
+            # A. 提取线条
+            if ent.dxftype() in LINE_TYPES:
+                try:
+                    # 圆弧/凸度/样条按弦高误差离散
+                    pts = entity_coords(ent)
                     if len(pts) < 2: continue
                     geom = LineString(pts)
-                raw_geoms.append(geom)
-                x1, y1, x2, y2 = geom.bounds
-                min_x, min_y = min(min_x, x1), min(min_y, y1)
-                max_x, max_y = max(max_x, x2), max(max_y, y2)
-            except: continue
+                    raw_geoms.append(geom)
+                    x1, y1, x2, y2 = geom.bounds
+                    min_x, min_y = min(min_x, x1), min(min_y, y1)
+                    max_x, max_y = max(max_x, x2), max(max_y, y2)
+                except: continue
         
-        # B. 提取文字包围盒 (用于避让)
-        if ent.dxftype() in ('TEXT', 'MTEXT'):
-            try:
-                insert = ent.dxf.insert
-                # 这里我们根据字高估算一个避让框
-                # 专业的做法是使用 ent.get_bounding_box()，但有些环境不支持，我们用简易算法
-                height = ent.dxf.height
-                width = len(ent.dxf.text) * height * 0.6 if ent.dxftype() == 'TEXT' else height * 5
-                t_box = box(insert.x - TEXT_OFFSET, insert.y - TEXT_OFFSET, 
-                            insert.x + width + TEXT_OFFSET, insert.y + height + TEXT_OFFSET)
-                text_boxes.append(t_box)
-            except: continue
+            # B. 提取文字包围盒 (用于避让)
+            if ent.dxftype() in ('TEXT', 'MTEXT'):
+                try:
+                    rel, anchor, hit = text_outline(ent)
+                    text_hits += hit
+                    if rel is not None: text_rings.append(rel + anchor)
+                except: continue
+        # 避让框一次性批量构造
+        text_boxes = list(shapely.polygons(shapely.linearrings(np.concatenate(text_rings), indices=np.repeat(np.arange(len(text_rings)), [len(r) for r in text_rings])))) if text_rings else []
+        st['lines'], st['texts'], st['text_cache_hits'] = len(raw_geoms), len(text_boxes), text_hits
 
     print("2. 拓扑重构与文字避让计算...")
-    thick_walls = [line.buffer(GAP_TOLERANCE, cap_style=2, join_style=2) for line in raw_geoms]
-    combined_walls = unary_union(thick_walls)
-    canvas = box(min_x - 10, min_y - 10, max_x + 10, max_y + 10)
-    spaces = canvas.difference(combined_walls)
-    
-    valid_regions = []
-    if isinstance(spaces, Polygon): valid_regions.append(spaces)
-    elif isinstance(spaces, MultiPolygon): valid_regions.extend(list(spaces.geoms))
-    valid_regions = sorted(valid_regions, key=lambda p: p.area, reverse=True)[1:]
+    with prof.stage('regions') as st:
+        thick_walls = [line.buffer(GAP_TOLERANCE, cap_style=2, join_style=2) for line in raw_geoms]
+        combined_walls = unary_union(thick_walls)
+        canvas = box(min_x - 10, min_y - 10, max_x + 10, max_y + 10)
+        spaces = canvas.difference(combined_walls)
+        
+        valid_regions = []
+        if isinstance(spaces, Polygon): valid_regions.append(spaces)
+        elif isinstance(spaces, MultiPolygon): valid_regions.extend(list(spaces.geoms))
+        valid_regions = sorted(valid_regions, key=lambda p: p.area, reverse=True)[1:]
+        st['faces'] = len(valid_regions)
 
     print(f"3. 正在生成智能填充...")
-    if "AA_HATCH" not in doc.layers: doc.layers.add("AA_HATCH")
+    out_doc = new_overlay(doc) if overlay else doc
+    if overlay: output_dxf = overlay_path(output_dxf)
+    text_tree = STRtree(text_boxes)  # 每个区域只检查附近的文字框
+    hatches = HatchWriter(out_doc, "AA_HATCH", simplify=simplify, vertex_budget=vertex_budget, area_error=area_error)
 
     count = 0
-    for i, poly in enumerate(valid_regions):
-        if poly.area < 1.0: continue
-        # 填充主边界
-        outer_poly = poly.buffer(-0.05, join_style=2).simplify(0.01)
-
-        try:
-            x1, y1, x2, y2 = outer_poly.bounds
-            diag_len = math.sqrt((x2-x1)**2 + (y2-y1)**2)
-            adaptive_scale = max(2.0, diag_len * SPARSITY_FACTOR) 
-
-            hatch = msp.add_hatch(dxfattribs={'layer': 'AA_HATCH'})
-            hatch.rgb = RGB_COLORS[i % len(RGB_COLORS)]
-            hatch.set_pattern_fill(CLEAN_PATTERNS[i % len(CLEAN_PATTERNS)], scale=adaptive_scale)
-            
-            # 写入外环
-            hatch.paths.add_polyline_path(list(outer_poly.exterior.coords)[:-1], is_closed=True)
+    with prof.stage('hatch_write') as st:
+        for i, poly in enumerate(valid_regions):
+            if poly.area < 1.0: continue
+            # 填充主边界
+            outer_poly = hatches.simplify(poly.buffer(-0.05, join_style=2))
+
+            try:
+                x1, y1, x2, y2 = outer_poly.bounds
+                diag_len = math.sqrt((x2-x1)**2 + (y2-y1)**2)
+                adaptive_scale = max(2.0, diag_len * SPARSITY_FACTOR) 
+
+                # 写入外环
+                paths = [list(outer_poly.exterior.coords)[:-1]]
             
-            # --- 智能避让：检查哪些文字框落在这个填充内 ---
-            for tb in text_boxes:
-                if outer_poly.intersects(tb):
-                    # 将文字框作为内环(Island)加入
-                    # 获取交集部分，防止文字框超出填充边界
-                    island = outer_poly.intersection(tb)
-                    if not island.is_empty and isinstance(island, Polygon):
-                        hatch.paths.add_polyline_path(list(island.exterior.coords)[:-1], is_closed=True)
+                # --- 智能避让：空间索引取出与这个填充相交的文字框 ---
+                near = text_tree.query(outer_poly, predicate='intersects')
+                if len(near):
+                    # 相互重叠的文字框先合并，再裁剪到填充边界内，作为内环(Island)加入
+                    islands = unary_union([text_boxes[j] for j in near]).intersection(outer_poly)
+                    paths += [list(g.exterior.coords)[:-1] for g in shapely.get_parts(islands) if isinstance(g, Polygon) and not g.is_empty]
             
-            # 写入原本存在的内部孔洞
-            for interior in outer_poly.interiors:
-                hatch.paths.add_polyline_path(list(interior.coords)[:-1], is_closed=True)
+                # 写入原本存在的内部孔洞
+                paths += [list(interior.coords)[:-1] for interior in outer_poly.interiors]
+                hatches.add(paths, CLEAN_PATTERNS[i % len(CLEAN_PATTERNS)], adaptive_scale, RGB_COLORS[i % len(RGB_COLORS)])
             
-            count += 1
-        except: continue
+                count += 1
+            except: continue
+        st['hatches'], st['vertices_in'], st['vertices_out'] = count, hatches.vertices_in, hatches.vertices_out
 
-    doc.saveas(OUTPUT_DXF)
+    with prof.stage('saveas'): out_doc.saveas(output_dxf)
+    prof.write(os.path.splitext(output_dxf)[0])
     print("------------------------------------------------")
     print(f"GitHub 提交版处理完成！生成区域: {count}")
+    print(hatches.summary())
     print(f"功能点：1.置底 2.RGB彩色 3.文字智能避让 4.面积无损")
+    return count
+
+def main(argv=None):
+    parser = add_batch_arguments(argparse.ArgumentParser())
+    parser.add_argument("-o", "--output", help=f"输出 DXF（仅单个输入文件时可用），默认 <输入>{OUTPUT_SUFFIX}")
+    parser.add_argument("--overlay", action="store_true", help="只输出填充图层的叠加图（_overlay.dxf），不整图另存")
+    add_hatch_arguments(parser, SIMPLIFY)
+    parser.add_argument("--profile", action="store_true", help="输出分阶段耗时/内存剖析报告（_profile.json / _profile.csv）")
+    args = parser.parse_args(argv)
+    opts = dict(profile=args.profile, overlay=args.overlay, **hatch_options(args))
+    if not args.files:
+        # 无参数时与原先一致：处理 INPUT_DXF，输出 OUTPUT_DXF
+        return 0 if run_final_v1(output_dxf=args.output, **opts) is not False else 1
+    if args.output and len(expand_inputs(args.files)) > 1: parser.error("--output 只能用于单个输入文件")
+    results = run_batch(run_final_v1, args.files, jobs=args.jobs, output_dxf=args.output, **opts)
+    pause(args)
+    return 0 if all(r[1] for r in results) else 1
 
 if __name__ == "__main__":
-    run_final_v1()
\ No newline at end of file
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
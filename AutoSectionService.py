@@ -0,0 +1,174 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr, redirect_stdout
+from AutoSectionBatch import _run_one, is_output
+from AutoSectionOutput import add_hatch_arguments, hatch_options
+
+# ================= 监视文件夹服务 =================
+# 常驻进程轮询共享目录：新放入的 DXF 大小/修改时间稳定一段时间后（仍在复制中的文件不处理）
+# 交给常驻进程池调用 process_file；每个任务在输入旁写 _job.json 状态与 _job.log 日志，
+# 已处理且未再改动的文件（含重启后）和本工具生成的输出文件一律跳过
+# =================================================
+
+STATUS_SUFFIX = "_job.json"
+LOG_SUFFIX = "_job.log"
+FINAL_STATES = ('done', 'failed', 'skipped')  # 其余状态（queued/running/retry/cancelled）在下次轮询或重启后重新处理
+MAX_ATTEMPTS = 2  # 工作进程崩溃时同一文件最多尝试次数
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+def _signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def status_path(path):
+    return os.path.splitext(path)[0] + STATUS_SUFFIX
+
+def read_status(path):
+    try:
+        with open(status_path(path), encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+def write_status(path, **fields):
+    # 先写临时文件再替换，外部读取时不会看到半截 JSON
+    status = {**(read_status(path) or {}), 'file': os.path.basename(path), **fields}
+    tmp = status_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, status_path(path))
+    return status
+
+def _writable(path):
+    # Windows 下仍被复制程序占用的文件无法改名；POSIX 下恒为 True
+    try:
+        os.rename(path, path); return True
+    except OSError: return False
+
+def _service_job(path, kwargs):
+    # 工作进程：process_file 的输出写入该任务的 _job.log，状态写入 _job.json
+    from AutoSection import process_file
+    write_status(path, state='running', started_at=_now(), pid=os.getpid())
+    base = os.path.splitext(path)[0]
+    with open(base + LOG_SUFFIX, "w", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        path, ok, result, sec, err = _run_one(process_file, path, kwargs)
+        if err: print(err)
+    outputs = [p for p in [base + "_RESULT.dxf", base + "_RESULT_overlay.dxf"] + sorted(glob.glob(glob.escape(base) + "_算量汇总*")) if os.path.exists(p)]
+    state = 'skipped' if result is None and ok else ('done' if ok else 'failed')
+    if state == 'failed' and not err:
+        # process_file 自行捕获异常并打印，取日志最后一行作为失败原因
+        with open(base + LOG_SUFFIX, encoding="utf-8") as log: err = ([l for l in log.read().splitlines() if l.strip()] or [""])[-1]
+    write_status(path, state=state, finished_at=_now(), seconds=round(sec, 2), outputs=[os.path.basename(p) for p in outputs],
+                 error=err.splitlines()[0] if err else None)
+    return path, state, sec
+
+class WatchService:
+    def __init__(self, folder, jobs=1, interval=2.0, settle=5.0, recursive=False, **kwargs):
+        self.folder, self.jobs, self.interval, self.settle = folder, jobs, interval, settle
+        self.pattern = os.path.join(folder, "**", "*.dxf") if recursive else os.path.join(folder, "*.dxf")
+        self.recursive, self.kwargs = recursive, kwargs
+        self.pending = {}  # path -> (签名, 签名开始稳定的时刻)
+        self.running = {}  # path -> (签名, future)
+        self.done = 0
+        self.pool = None
+
+    def log(self, msg):
+        print(f"[{_now()}] {msg}", flush=True)
+
+    def candidates(self):
+        for path in glob.glob(self.pattern, recursive=self.recursive):
+            if not is_output(path): yield os.path.normpath(path)
+
+    def scan(self):
+        # 一轮轮询：更新待定文件的稳定计时，返回本轮可以入队的文件
+        now, ready, seen = time.monotonic(), [], set()
+        for path in self.candidates():
+            seen.add(path)
+            if path in self.running: continue
+            try: sig = _signature(path)
+            except OSError: continue
+            status = read_status(path)
+            if status and status.get('signature') == sig and status.get('state') in FINAL_STATES:
+                self.pending.pop(path, None); continue
+            old = self.pending.get(path)
+            if old is None or old[0] != sig: self.pending[path] = (sig, now); continue
+            if now - old[1] >= self.settle and _writable(path):
+                del self.pending[path]; ready.append((path, sig))
+        for path in set(self.pending) - seen: del self.pending[path]
+        return sorted(ready, key=lambda r: r[1][1])  # 按修改时间先到先处理
+
+    def submit(self, path, sig):
+        old = read_status(path) or {}
+        attempts = old.get('attempts', 0) if old.get('signature') == sig else 0
+        write_status(path, state='queued', signature=sig, attempts=attempts + 1, queued_at=_now(), started_at=None, finished_at=None, error=None)
+        self.running[path] = (sig, self.pool.submit(_service_job, path, self.kwargs))
+        self.log(f"入队 {os.path.basename(path)}（排队 {len(self.running)}）")
+
+    def collect(self):
+        broken = False
+        for path, (sig, fut) in list(self.running.items()):
+            if not fut.done(): continue
+            del self.running[path]
+            if fut.cancelled():
+                write_status(path, state='cancelled'); continue
+            try:
+                _, state, sec = fut.result()
+                self.log(f"{'✅' if state != 'failed' else '❌'} {os.path.basename(path)} {state} ({sec:.2f}s)")
+                self.done += 1
+            except BrokenProcessPool:
+                # 进程池中任一进程崩溃会连带同池任务，无法区分元凶：未超次数的放回重试
+                broken = True
+                retry = (read_status(path) or {}).get('attempts', 0) < MAX_ATTEMPTS
+                write_status(path, state='retry' if retry else 'failed', finished_at=_now(), error="工作进程异常退出")
+                self.log(f"❌ {os.path.basename(path)} 工作进程异常退出{'，稍后重试' if retry else ''}")
+            except Exception as e:
+                write_status(path, state='failed', finished_at=_now(), error=str(e))
+                self.log(f"❌ {os.path.basename(path)} {e}"); self.done += 1
+        if broken:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+
+    def run(self, once=False):
+        self.log(f"监视 {os.path.abspath(self.folder)}（{self.jobs} 个工作进程，轮询 {self.interval}s，稳定 {self.settle}s）")
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            while True:
+                for path, sig in self.scan(): self.submit(path, sig)
+                self.collect()
+                if once and not self.pending and not self.running: break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            self.log("收到中断，等待进行中的任务结束...")
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.collect()
+            self.log(f"服务停止，本次共处理 {self.done} 个文件")
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="监视文件夹，自动对新放入的 DXF 出图出量")
+    parser.add_argument("folder", help="监视的目录")
+    parser.add_argument("--jobs", type=int, default=2, help="常驻工作进程数")
+    parser.add_argument("--interval", type=float, default=2.0, help="轮询间隔（秒）")
+    parser.add_argument("--settle", type=float, default=5.0, help="文件大小/修改时间保持不变多少秒后才处理")
+    parser.add_argument("--recursive", action="store_true", help="同时监视子目录")
+    parser.add_argument("--once", action="store_true", help="处理完目录中现有文件后退出")
+    parser.add_argument("--workers", type=int, default=1, help="单文件内断面计算/分块构面并行进程数")
+    parser.add_argument("--tile-size", type=float, default=0, help="整图填充分块边长（图纸单位），0 为不分块")
+    parser.add_argument("--no-cache", action="store_true", help="不使用增量计算缓存")
+    parser.add_argument("--overlay", action="store_true", help="只输出填充图层的叠加图（_RESULT_overlay.dxf）")
+    add_hatch_arguments(parser)
+    parser.add_argument("--profile", action="store_true", help="每个文件输出分阶段剖析报告")
+    parser.add_argument("--format", default="xlsx", help="报表格式，逗号分隔：xlsx,csv,parquet")
+    args = parser.parse_args()
+    if not os.path.isdir(args.folder):
+        print(f"目录不存在: {args.folder}"); sys.exit(2)
+    WatchService(args.folder, jobs=args.jobs, interval=args.interval, settle=args.settle, recursive=args.recursive,
+                 workers=args.workers, tile_size=args.tile_size, use_cache=not args.no_cache, profile=args.profile, overlay=args.overlay,
+                 **hatch_options(args), report_formats=tuple(f.strip().lower() for f in args.format.split(",") if f.strip())).run(once=args.once)
\ No newline at end of file
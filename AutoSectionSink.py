@@ -0,0 +1,153 @@
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+
+# ================= 算量报表流式输出 =================
+# 断面结果算完即写出：xlsx 用 openpyxl 只写模式（常量内存）、CSV 逐行追加、Parquet 分批写入，
+# 内存中只保留 桩号×地层 的汇总累加；多个文件的结果可合并为一份按桩号排序的总表
+# ===================================================
+
+SHEET_COLUMNS = ['断面', '地层', '设计', '净超挖']  # 单文件 xlsx 的 Sheet1，与原报表一致
+ROW_COLUMNS = ['断面', '桩号', '地层', '设计', '净超挖']  # 单文件 CSV / Parquet 明细
+MERGED_COLUMNS = ['文件'] + ROW_COLUMNS
+REPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+PARQUET_BATCH = 5000  # Parquet 每批写入的行数
+PIVOTS = (('设计量汇总', 0), ('净超挖汇总', 1))
+
+def station_sort_key(station_str):
+    nums = re.findall(r'\d+', str(station_str))
+    # 考虑 K71+300 结构，组合为整数排序
+    return int("".join(nums)) if nums else 0
+
+def _pyarrow():
+    try:
+        import pyarrow, pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet 输出需要安装 pyarrow（pip install pyarrow）")
+
+def _schema(pa, columns):
+    return pa.schema([(c, pa.float64() if c in ('设计', '净超挖') else pa.string()) for c in columns])
+
+class ReportSink:
+    # 按扩展名选择格式；add 逐断面写入明细并累加汇总，close 时写出按桩号排序的汇总
+    def __init__(self, path, columns=None):
+        self.path, self.ext = path, os.path.splitext(path)[1].lower().lstrip('.')
+        if self.ext not in REPORT_FORMATS: raise ValueError(f"不支持的报表格式: {path}")
+        self.columns = columns or (SHEET_COLUMNS if self.ext == 'xlsx' else ROW_COLUMNS)
+        self.totals = {}  # 桩号 -> {地层: [设计, 净超挖]}，插入顺序即首次出现顺序
+        self.rows, self.batch, self.out = 0, [], None
+        if self.ext == 'xlsx':
+            from openpyxl import Workbook
+            self.out = Workbook(write_only=True)
+            self.sheet = self.out.create_sheet('Sheet1'); self.sheet.append(self.columns)
+        elif self.ext == 'csv':
+            self.out = open(path, "w", encoding="utf-8-sig", newline="")
+            self.writer = csv.writer(self.out); self.writer.writerow(self.columns)
+        else: self.pa = _pyarrow()
+
+    def add(self, rows):
+        for r in rows:
+            vals = [r.get(c, '') for c in self.columns]
+            if self.ext == 'xlsx': self.sheet.append(vals)
+            elif self.ext == 'csv': self.writer.writerow(vals)
+            else:
+                self.batch.append(vals)
+                if len(self.batch) >= PARQUET_BATCH: self._flush()
+            acc = self.totals.setdefault(r['桩号'], {}).setdefault(r['地层'], [0.0, 0.0])
+            acc[0] += r['设计']; acc[1] += r['净超挖']
+            self.rows += 1
+
+    def _flush(self):
+        pa = self.pa
+        if self.out is None: self.out = pa.parquet.ParquetWriter(self.path, _schema(pa, self.columns))
+        self.out.write_table(pa.Table.from_pylist([dict(zip(self.columns, v)) for v in self.batch], schema=_schema(pa, self.columns)))
+        self.batch = []
+
+    def pivot(self):
+        # 汇总表：桩号按 station_sort_key 稳定排序，地层按排序后首次出现的顺序，缺项补 0
+        stations = sorted(self.totals, key=station_sort_key)
+        layers = list(dict.fromkeys(ly for st in stations for ly in self.totals[st]))
+        return layers, [(st, [self.totals[st].get(ly, (0.0, 0.0)) for ly in layers]) for st in stations]
+
+    def close(self):
+        # 没有任何行时不留下输出文件，返回是否写出
+        if not self.rows:
+            self.abort(); return False
+        layers, table = self.pivot()
+        stem = os.path.splitext(self.path)[0]
+        if self.ext == 'xlsx':
+            for name, k in PIVOTS:
+                ws = self.out.create_sheet(name); ws.append(['桩号'] + layers)
+                for st, vals in table: ws.append([st] + [v[k] for v in vals])
+            self.out.save(self.path)
+        elif self.ext == 'csv':
+            self.out.close()
+            for name, k in PIVOTS:
+                with open(f"{stem}_{name}.csv", "w", encoding="utf-8-sig", newline="") as f:
+                    w = csv.writer(f); w.writerow(['桩号'] + layers)
+                    for st, vals in table: w.writerow([st] + [v[k] for v in vals])
+        else:
+            if self.batch or self.out is None: self._flush()
+            self.out.close()
+            pa, cols = self.pa, ['桩号', '地层', '设计', '净超挖']
+            long = [dict(zip(cols, (st, ly, *v))) for st, vals in table for ly, v in zip(layers, vals) if v[0] or v[1]]
+            pa.parquet.write_table(pa.Table.from_pylist(long, schema=_schema(pa, cols)), f"{stem}_汇总.parquet")
+        self.out = None
+        return True
+
+    def abort(self):
+        # 出错或无数据：关闭并删除未完成的输出
+        if self.ext != 'xlsx' and self.out is not None: self.out.close()
+        self.out = None
+        if self.ext != 'xlsx' and os.path.exists(self.path): os.remove(self.path)
+
+def read_rows(path):
+    # 逐行读取单文件报表：CSV/Parquet 读明细；旧 xlsx 无桩号明细，改读两张汇总表（按 桩号×地层 输出）
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f): yield {**r, '设计': float(r['设计']), '净超挖': float(r['净超挖'])}
+    elif ext == '.parquet':
+        for batch in _pyarrow().parquet.ParquetFile(path).iter_batches(PARQUET_BATCH): yield from batch.to_pylist()
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            d_rows, o_rows = (wb[name].iter_rows(values_only=True) for name, _ in PIVOTS)
+            layers = next(d_rows)[1:]; next(o_rows)
+            for (st, *ds), (_, *os_) in zip(d_rows, o_rows):
+                for ly, d, o in zip(layers, ds, os_):
+                    if d or o: yield {'断面': '', '桩号': st, '地层': ly, '设计': d or 0.0, '净超挖': o or 0.0}
+        finally: wb.close()
+
+def report_for(input_path, formats=REPORT_FORMATS):
+    # 某个 DXF 已生成的单文件报表，优先带桩号明细的 CSV / Parquet
+    base = os.path.splitext(input_path)[0] + "_算量汇总."
+    for fmt in ('csv', 'parquet', 'xlsx'):
+        if fmt in formats and os.path.exists(base + fmt): return base + fmt
+    return None
+
+def merge_into(sink, report_path, name=None):
+    # 把一份单文件报表追加进合并报表，文件列取 DXF 名
+    name = name or os.path.basename(report_path).split("_算量汇总")[0]
+    sink.add({**r, '文件': name} for r in read_rows(report_path))
+
+def merge_reports(reports, output):
+    sink = ReportSink(output, MERGED_COLUMNS)
+    for path in reports: merge_into(sink, path)
+    return sink.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并多个单文件算量报表为一份按桩号排序的总表")
+    parser.add_argument("output", help="合并结果（.xlsx / .csv / .parquet）")
+    parser.add_argument("reports", nargs="+", help="单文件报表 _算量汇总.csv/.parquet/.xlsx，支持通配符")
+    args = parser.parse_args()
+    reports = [f for f in dict.fromkeys(f for pat in args.reports for f in (sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]))
+               if os.path.abspath(f) != os.path.abspath(args.output)]
+    ok = merge_reports(reports, args.output)
+    print(f"已合并 {len(reports)} 份报表 -> {args.output}" if ok else "没有可合并的数据")
+    sys.exit(0 if ok else 1)
\ No newline at end of file
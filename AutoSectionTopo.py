@@ -0,0 +1,130 @@
+import math
+import numpy as np
+import shapely
+from concurrent.futures import ProcessPoolExecutor
+from shapely import STRtree, box
+from shapely.ops import polygonize
+from AutoSectionCache import digest
+
+# ================= 线网拓扑公共模块 =================
+# 打断（noding）统一走 union_all(grid_size)：GEOS 在定精度网格上做 snap-rounding 打断，
+# 网格内的近重合线/交点合并，取代嵌套的 unary_union，避免浮点打断的拓扑异常。
+# 地质线网每个文件打断一次；断面切割线（断面框边、按框延长的地面线、延长后的地质线）
+# 是每个断面临时构造的几何，不在整图线网中，只能按断面各自打断
+# ===================================================
+
+SNAP_GRID = 1e-6  # 打断网格（图纸单位），0 表示浮点打断；面积偏差约为 网格×面周长，取 1e-4 时算量已偏差 0.003
+
+def node_lines(lines, grid=SNAP_GRID):
+    # 在固定精度网格上一次性打断整个线网，返回打断后的 (Multi)LineString
+    if not len(lines): return shapely.MultiLineString([])
+    return shapely.union_all(np.asarray(lines, dtype=object), grid_size=grid or None)
+
+def _segments(geoms):
+    # 线/环拆成两点线段，端点按字典序规范化，返回 (n,4) 数组
+    coords, idx = shapely.get_coordinates(geoms, return_index=True)
+    segs = np.hstack([coords[:-1], coords[1:]])[idx[:-1] == idx[1:]] + 0.0
+    swap = (segs[:, 0] > segs[:, 2]) | ((segs[:, 0] == segs[:, 2]) & (segs[:, 1] > segs[:, 3]))
+    segs[swap] = segs[swap][:, [2, 3, 0, 1]]
+    return segs
+
+def _rows(a):
+    return np.ascontiguousarray(a).view(np.dtype((np.void, a.dtype.itemsize * a.shape[1]))).ravel()
+
+def connected_labels(n, a, b):
+    # 并查集（向量化挂接 + 路径压缩）：n 个元素按边 (a[i], b[i]) 求连通分量，返回每个元素的分量代表（分量内最小下标）
+    lab = np.arange(n)
+    while True:
+        m = np.minimum(lab[a], lab[b])
+        new = lab.copy(); np.minimum.at(new, a, m); np.minimum.at(new, b, m)
+        new = new[new]
+        if np.array_equal(new, lab): return lab
+        lab = new
+
+def _border_components(segs, xs, ys, tol):
+    # 线段按公共端点求连通分量，只保留含分块边界切点的分量（跨块面的外环必然穿过分块边界）
+    pts = segs.reshape(-1, 2)
+    _, inv = np.unique(pts, axis=0, return_inverse=True)
+    inv = inv.ravel(); a, b = inv[0::2], inv[1::2]
+    lab = connected_labels(inv.max() + 1, a, b)
+    def near(v, borders):
+        if not len(borders): return np.zeros(len(v), dtype=bool)
+        k = np.clip(np.searchsorted(borders, v), 1, len(borders)) - 1
+        return (np.abs(v - borders[k]) <= tol) | (np.abs(v - borders[np.minimum(k + 1, len(borders) - 1)]) <= tol)
+    on_border = near(pts[:, 0], xs) | near(pts[:, 1], ys)
+    keep = np.zeros(len(lab), dtype=bool); keep[np.unique(lab[inv[on_border]])] = True
+    return keep[lab[a]]
+
+def _polygonize_tile(task):
+    # 单个分块：打断并构面，返回 (面 WKB 列表, 打断后线网 WKB)，均为十六进制以便写入 JSON 缓存
+    wkb, grid = task
+    noded = node_lines(list(shapely.from_wkb(wkb)), grid)
+    faces = list(polygonize(noded))
+    return shapely.to_wkb(faces, hex=True).tolist() if faces else [], shapely.to_wkb(noded, hex=True)
+
+def polygonize_tiled(lines, tile_size, workers=1, grid=SNAP_GRID, cache=None):
+    # 分块构面：按规则网格裁剪线网，各块独立打断+构面（可并行），
+    # 跨块的面由接缝线段再构面补齐，结果与整图 polygonize(node_lines(lines)) 一致；
+    # 给定 cache 时按分块内容哈希复用未改动分块的结果
+    lines = [l for l in lines if not l.is_empty]
+    if not lines: return []
+    x0, y0, x1, y1 = shapely.total_bounds(lines)
+    nx, ny = max(1, math.ceil((x1 - x0) / tile_size)), max(1, math.ceil((y1 - y0) / tile_size))
+    tree, arr = STRtree(lines), np.asarray(lines, dtype=object)
+    xs, ys = x0 + tile_size * np.arange(1, nx), y0 + tile_size * np.arange(1, ny)
+    tasks = []
+    for i in range(nx):
+        for j in range(ny):
+            tile = box(x0 + i * tile_size, y0 + j * tile_size, min(x1, x0 + (i + 1) * tile_size), min(y1, y0 + (j + 1) * tile_size))
+            hits = tree.query(tile, predicate='intersects')
+            if len(hits): tasks.append((shapely.to_wkb(shapely.intersection(arr[hits], tile)), grid))
+
+    keys = [digest('tile', wkb, g) for wkb, g in tasks] if cache else [None] * len(tasks)
+    results = [cache.get(k) if cache else None for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool: fresh = list(pool.map(_polygonize_tile, [tasks[i] for i in todo]))
+    else: fresh = [_polygonize_tile(tasks[i]) for i in todo]
+    for i, r in zip(todo, fresh):
+        results[i] = r
+        if cache: cache.put(keys[i], r)
+
+    faces = [f for face_wkb, _ in results for f in shapely.from_wkb(face_wkb)]
+    edges = [shapely.from_wkb(edge_wkb) for _, edge_wkb in results]
+    # 接缝：被两个已成面共享的线段在块内已闭合，其余线段（含块边界切口）再整体构面一次
+    face_segs = _segments(shapely.get_rings(faces))
+    uniq, cnt = np.unique(face_segs, axis=0, return_counts=True)
+    inner = uniq[cnt >= 2]
+    edge_segs = _segments(shapely.get_parts(edges))
+    seam = edge_segs[~np.isin(_rows(edge_segs), _rows(inner))] if len(inner) else edge_segs
+    if len(seam): seam = seam[_border_components(seam, xs, ys, max(grid, 1e-9) * 2)]
+    if len(seam):
+        face_tree, stitched = STRtree(faces), []
+        seam_lines = shapely.get_parts(shapely.line_merge(shapely.multilinestrings(shapely.linestrings(seam.reshape(-1, 2, 2)))))
+        for f in polygonize(node_lines(seam_lines, grid)):
+            # 先挖掉落在面内的已成面（不接触分块边界的内孔不在接缝线里），
+            # 剩余面积≈0 说明是由已成面拼成的外轮廓，跳过；否则为真正跨块的面
+            inside = face_tree.query(f, predicate='contains')
+            if len(inside): f = f.difference(shapely.union_all([faces[k] for k in inside]))
+            if f.area > max(grid, 1e-9) * f.length: stitched.append(f)
+        faces += stitched
+    return faces
+
+def close_gaps(lines, tol, grid=SNAP_GRID):
+    # 端点补缝：打断后的线网中度数为 1 的悬空端点，在 tol 内向最近的其他线段补一条短连接线
+    edges = shapely.get_parts(node_lines(lines, grid))
+    if not len(edges): return edges
+    ends = np.concatenate([shapely.get_coordinates(shapely.get_point(edges, 0)), shapely.get_coordinates(shapely.get_point(edges, -1))])
+    owner = np.concatenate([np.arange(len(edges))] * 2)
+    _, inv, cnt = np.unique(ends, axis=0, return_inverse=True, return_counts=True)
+    free = cnt[inv.ravel()] == 1
+    pts, owner = shapely.points(ends[free]), owner[free]
+    pi, ej = STRtree(edges).query(pts, predicate='dwithin', distance=tol)
+    keep = ej != owner[pi]
+    pi, ej = pi[keep], ej[keep]
+    if not len(pi): return edges
+    # 每个悬空端点只取距离最近的一条
+    order = np.lexsort((shapely.distance(pts[pi], edges[ej]), pi))
+    first = order[np.r_[True, pi[order][1:] != pi[order][:-1]]]
+    connectors = shapely.shortest_line(pts[pi[first]], edges[ej[first]])
+    return shapely.get_parts(node_lines(np.concatenate([edges, connectors]), grid))
\ No newline at end of file
@@ -1,81 +1,128 @@
-import ezdxf
+import time
+_IMPORT_T0 = time.perf_counter()  # 模块加载计时起点：launch 据此报告本脚本顶层导入耗时
 import math
 import os
 import sys
+import argparse
+import multiprocessing
 from shapely.geometry import LineString, MultiPolygon, Polygon, box
-from shapely.ops import unary_union
+from shapely.ops import unary_union, polygonize
+from AutoSectionBatch import add_batch_arguments, run_batch, pause
+from AutoSectionLauncher import launch
+from AutoSectionTopo import close_gaps
+from AutoSectionIO import LINE_TYPES, entity_coords
+from AutoSectionOutput import AREA_ERROR, HatchWriter, add_hatch_arguments, hatch_options, new_overlay, overlay_path
+from AutoSectionProfile import make_profiler
 
-def process_logic(input_path):
-    output_path = input_path.replace(".dxf", "_填充完成.dxf")
-    doc = ezdxf.readfile(input_path)
-    msp = doc.modelspace()
+WALL_WIDTH = 0.2  # buffer 引擎的线宽（单侧），可闭合 2 倍宽度以内的缺口
+SIMPLIFY = 0.01  # 填充边界默认简化容差（受面积误差上限约束）
+
+def buffer_regions(raw_geoms, bounds):
+    # 原版补缝：线条加粗后从画布中扣除，剩余空白即闭合区域（去掉最大的外部区域）
+    min_x, min_y, max_x, max_y = bounds
+    thick_walls = [line.buffer(WALL_WIDTH, cap_style=2, join_style=2) for line in raw_geoms]
+    combined_walls = unary_union(thick_walls)
+    spaces = box(min_x-10, min_y-10, max_x+10, max_y+10).difference(combined_walls)
+    
+    valid_regions = []
+    if isinstance(spaces, Polygon): valid_regions.append(spaces)
+    elif isinstance(spaces, MultiPolygon): valid_regions.extend(list(spaces.geoms))
+    return sorted(valid_regions, key=lambda p: p.area, reverse=True)[1:]
+
+def snap_regions(raw_geoms):
+    # 端点补缝：悬空端点在同样的缺口宽度内连到最近线段，再直接对线网构面
+    faces = list(polygonize(close_gaps(raw_geoms, 2 * WALL_WIDTH)))
+    return sorted(faces, key=lambda p: p.area, reverse=True)
+
+def compare_engines(raw_geoms, bounds):
+    # 两种补缝引擎的耗时与面积对比（只统计 >= 1.0 的有效区域）
+    stats = {}
+    for name, func in (('buffer', lambda: buffer_regions(raw_geoms, bounds)), ('snap', lambda: snap_regions(raw_geoms))):
+        t0 = time.perf_counter()
+        regions = [p for p in func() if p.area >= 1.0]
+        stats[name] = (time.perf_counter() - t0, len(regions), sum(p.area for p in regions))
+    (tb, nb, ab), (ts, ns, as_) = stats['buffer'], stats['snap']
+    print(f"  buffer 引擎: {tb:.2f}s, {nb} 个区域, 总面积 {ab:.3f}")
+    print(f"  snap   引擎: {ts:.2f}s, {ns} 个区域, 总面积 {as_:.3f}")
+    print(f"  加速 {tb / max(ts, 1e-9):.1f}x, 面积差 {as_ - ab:+.3f} ({(as_ - ab) / max(ab, 1e-9):+.3%})")
+    return stats
+
+def process_logic(input_path, engine='buffer', compare=False, profile=False, overlay=False,
+                  simplify=SIMPLIFY, vertex_budget=0, area_error=AREA_ERROR):
+    output_path = os.path.splitext(input_path)[0] + "_填充完成.dxf"
+    if overlay: output_path = overlay_path(output_path)
+    prof = make_profiler(profile, input_path)
+    with prof.stage('read'):
+        import ezdxf  # 延迟导入，缩短拖拽启动时间
+        doc = ezdxf.readfile(input_path)
+        msp = doc.modelspace()
 
     raw_geoms = []
     min_x, min_y, max_x, max_y = float('inf'), float('inf'), float('-inf'), float('-inf')
 
     # 1. 提取几何边界
-    for ent in msp:
-        if ent.dxftype() in ('LINE', 'LWPOLYLINE', 'POLYLINE'):
-            try:
-                if ent.dxftype() == 'LINE':
-                    geom = LineString([ent.dxf.start.vec2, ent.dxf.end.vec2])
-                else:
-                    pts = [p[:2] for p in ent.get_points()] if ent.dxftype() == 'LWPOLYLINE' else [p.vtx.vec2 for p in ent.vertices]
+    with prof.stage('extract') as st:
+        for ent in msp:
+            if ent.dxftype() in LINE_TYPES:
+                try:
+                    # 圆弧/凸度/样条按弦高误差离散
+                    pts = entity_coords(ent)
                     if len(pts) < 2: continue
                     geom = LineString(pts)
-                raw_geoms.append(geom)
-                x1, y1, x2, y2 = geom.bounds
-                min_x, min_y, max_x, max_y = min(min_x, x1), min(min_y, y1), max(max_x, x2), max(max_y, y2)
-            except: continue
+                    raw_geoms.append(geom)
+                    x1, y1, x2, y2 = geom.bounds
+                    min_x, min_y, max_x, max_y = min(min_x, x1), min(min_y, y1), max(max_x, x2), max(max_y, y2)
+                except: continue
+        st['lines'] = len(raw_geoms)
 
     # 2. 拓扑计算（确保面积完整，不处理文字孔洞）
-    thick_walls = [line.buffer(0.2, cap_style=2, join_style=2) for line in raw_geoms]
-    combined_walls = unary_union(thick_walls)
-    spaces = box(min_x-10, min_y-10, max_x+10, max_y+10).difference(combined_walls)
-    
-    valid_regions = []
-    if isinstance(spaces, Polygon): valid_regions.append(spaces)
-    elif isinstance(spaces, MultiPolygon): valid_regions.extend(list(spaces.geoms))
-    valid_regions = sorted(valid_regions, key=lambda p: p.area, reverse=True)[1:]
+    bounds = (min_x, min_y, max_x, max_y)
+    if compare: compare_engines(raw_geoms, bounds)
+    with prof.stage('regions_' + engine) as st:
+        valid_regions = snap_regions(raw_geoms) if engine == 'snap' else buffer_regions(raw_geoms, bounds)
+        st['faces'] = len(valid_regions)
 
-    # 3. 生成填充
-    if "AA_填充层" not in doc.layers: doc.layers.add("AA_填充层", color=7)
+    # 3. 生成填充（叠加图模式写入只含填充层的新文档）
+    out_doc = new_overlay(doc) if overlay else doc
+    hatches = HatchWriter(out_doc, "AA_填充层", simplify=simplify, vertex_budget=vertex_budget, area_error=area_error)
     rgb_list = [(255,150,150), (150,255,150), (150,150,255), (255,255,100), (255,100,255), (100,255,255)]
     patterns = ['ANSI31', 'ANSI32', 'ANSI33']
     
     count = 0
-    for i, poly in enumerate(valid_regions):
-        if poly.area < 1.0: continue
-        outer_poly = poly.buffer(-0.05, join_style=2).simplify(0.01)
-        try:
-            diag = math.sqrt((outer_poly.bounds[2]-outer_poly.bounds[0])**2 + (outer_poly.bounds[3]-outer_poly.bounds[1])**2)
-            hatch = msp.add_hatch(dxfattribs={'layer': 'AA_填充层'})
-            hatch.rgb = rgb_list[i % len(rgb_list)]
-            hatch.set_pattern_fill(patterns[i%3], scale=max(2.0, diag*0.2))
-            hatch.paths.add_polyline_path(list(outer_poly.exterior.coords)[:-1], is_closed=True)
-            for interior in outer_poly.interiors:
-                hatch.paths.add_polyline_path(list(interior.coords)[:-1], is_closed=True)
-            count += 1
-        except: continue
+    with prof.stage('hatch_write') as st:
+        for i, poly in enumerate(valid_regions):
+            if poly.area < 1.0: continue
+            # snap 引擎的面即线网本身的面，无需回缩；边界简化由 HatchWriter 按顶点预算与面积误差控制
+            outer_poly = poly if engine == 'snap' else poly.buffer(-0.05, join_style=2)
+            try:
+                diag = math.sqrt((outer_poly.bounds[2]-outer_poly.bounds[0])**2 + (outer_poly.bounds[3]-outer_poly.bounds[1])**2)
+                hatches.add_polygon(outer_poly, patterns[i%3], max(2.0, diag*0.2), rgb_list[i % len(rgb_list)])
+                count += 1
+            except: continue
+        st['hatches'], st['vertices_in'], st['vertices_out'] = count, hatches.vertices_in, hatches.vertices_out
+    print(f"  {hatches.summary()}")
 
-    doc.saveas(output_path)
+    with prof.stage('saveas'): out_doc.saveas(output_path)
+    prof.write(os.path.splitext(output_path)[0])
     return output_path, count
 
-if __name__ == "__main__":
-    # 获取拖拽进来的文件路径
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-        if file_path.lower().endswith('.dxf'):
-            print(f"正在处理: {file_path}")
-            try:
-                out, num = process_logic(file_path)
-                print(f"成功！生成 {num} 个区域。")
-                print(f"保存至: {out}")
-            except Exception as e:
-                print(f"处理失败: {e}")
-        else:
-            print("请拖入一个 .dxf 文件！")
+def main(argv=None):
+    parser = add_batch_arguments(argparse.ArgumentParser())
+    parser.add_argument("--engine", choices=("buffer", "snap"), default="buffer", help="补缝引擎：buffer 加粗扣除（原版）/ snap 端点吸附")
+    parser.add_argument("--compare", action="store_true", help="同时运行两种引擎并输出耗时与面积差")
+    parser.add_argument("--overlay", action="store_true", help="只输出填充图层的叠加图（_填充完成_overlay.dxf），不整图另存")
+    add_hatch_arguments(parser, SIMPLIFY)
+    parser.add_argument("--profile", action="store_true", help="输出分阶段耗时/内存剖析报告（_profile.json / _profile.csv）")
+    args = parser.parse_args(argv)
+    # 获取拖拽进来的文件路径（支持多个文件与通配符）
+    if args.files:
+        results = run_batch(process_logic, args.files, jobs=args.jobs, engine=args.engine, compare=args.compare, profile=args.profile, overlay=args.overlay, **hatch_options(args))
     else:
-        print("使用方法：将 DXF 文件直接拖动到此 EXE 图标上。")
+        print("使用方法：将 DXF 文件直接拖动到此 EXE 图标上。"); results = []
     
-    input("\n处理结束，按回车键退出...")
\ No newline at end of file
+    pause(args, "\n处理结束，按回车键退出...")
+    return 0 if all(r[1] for r in results) else 1
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(launch('drag', sys.argv[1:], main, _IMPORT_T0))
\ No newline at end of file
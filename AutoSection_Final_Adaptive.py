@@ -1,19 +1,32 @@
-import ezdxf
+import time
+_IMPORT_T0 = time.perf_counter()  # 模块加载计时起点：launch 据此报告本脚本顶层导入耗时
 import math
 import os
 import sys
-import time
+import argparse
+import multiprocessing
 from shapely.geometry import LineString
-from shapely.ops import polygonize, unary_union
+from shapely.ops import polygonize
+from AutoSectionBatch import add_batch_arguments, run_batch, pause
+from AutoSectionLauncher import launch
+from AutoSectionTopo import node_lines, polygonize_tiled
+from AutoSectionIO import LINE_TYPES, entity_coords
+from AutoSectionOutput import AREA_ERROR, HatchWriter, add_hatch_arguments, hatch_options, new_overlay, overlay_path
+from AutoSectionProfile import make_profiler
 
-def process_dxf_final(input_path):
-    output_path = input_path.replace(".dxf", "_算量自适应版.dxf")
+def process_dxf_final(input_path, tile_size=0, workers=1, profile=False, overlay=False,
+                      simplify=0.0, vertex_budget=0, area_error=AREA_ERROR):
+    output_path = os.path.splitext(input_path)[0] + "_算量自适应版.dxf"
+    if overlay: output_path = overlay_path(output_path)
+    prof = make_profiler(profile, input_path)
     try:
-        doc = ezdxf.readfile(input_path)
-        msp = doc.modelspace()
+        with prof.stage('read'):
+            import ezdxf  # 延迟导入，缩短拖拽启动时间
+            doc = ezdxf.readfile(input_path)
+            msp = doc.modelspace()
     except Exception as e:
         print(f"读取失败: {e}")
-        return 0
+        return False
 
     # 1. 更加稳健的图层状态获取
     # 只要图层不是明确被关闭 (Off)，就认为它是可见的
@@ -24,68 +37,67 @@ def process_dxf_final(input_path):
 
     raw_lines = []
     # 2. 提取线条
-    for ent in msp:
-        if ent.dxftype() in ('LINE', 'LWPOLYLINE', 'POLYLINE'):
-            # 过滤逻辑：如果在关闭图层且不是我们自己建的层，则跳过
-            lname = ent.dxf.layer
-            if lname not in visible_layers and not lname.startswith("AA_"):
-                continue
-                
-            try:
-                if ent.dxftype() == 'LINE':
-                    raw_lines.append(LineString([ent.dxf.start.vec2, ent.dxf.end.vec2]))
-                else:
-                    pts = [p[:2] for p in ent.get_points()] if ent.dxftype() == 'LWPOLYLINE' else [p.vtx.vec2 for p in ent.vertices]
-                    if len(pts) >= 2:
-                        for i in range(len(pts)-1):
-                            raw_lines.append(LineString([pts[i], pts[i+1]]))
-            except: continue
+    with prof.stage('extract') as st:
+        for ent in msp:
+            if ent.dxftype() in LINE_TYPES:
+                # 过滤逻辑：如果在关闭图层且不是我们自己建的层，则跳过
+                lname = ent.dxf.layer
+                if lname not in visible_layers and not lname.startswith("AA_"):
+                    continue
+                    
+                try:
+                    # 圆弧/凸度/样条按弦高误差离散
+                    pts = entity_coords(ent)
+                    if len(pts) >= 2: raw_lines.append(LineString(pts))
+                except: continue
+        st['lines'] = len(raw_lines)
 
     if not raw_lines:
         print("\n[错误] 在当前开启的图层中未找到任何线条，请检查 LAYISO 是否正确。")
         return 0
 
-    # 3. 0误差核心算法
-    merged_lines = unary_union(raw_lines)
-    polygons = list(polygonize(merged_lines))
+    # 3. 0误差核心算法：网格吸附后一次性打断（无需预先拆成两点线段），大图可分块并行构面
+    with prof.stage('polygonize') as st:
+        if tile_size: polygons = polygonize_tiled(raw_lines, tile_size, workers)
+        else: polygons = list(polygonize(node_lines(raw_lines)))
+        st['faces'] = len(polygons)
     
     # 过滤掉杂质 (面积太小的不要)
     valid_regions = [p for p in polygons if p.area > 0.01]
     valid_regions = sorted(valid_regions, key=lambda p: p.area, reverse=True)
 
-    if "AA_填充算量层" not in doc.layers:
-        doc.layers.add("AA_填充算量层", color=7)
+    # 叠加图模式写入只含填充层的新文档
+    out_doc = new_overlay(doc) if overlay else doc
+    hatches = HatchWriter(out_doc, "AA_填充算量层", simplify=simplify, vertex_budget=vertex_budget, area_error=area_error)
 
     rgb_list = [(255,150,150), (150,255,150), (150,150,255), (255,255,100), (255,100,255), (100,255,255)]
     patterns = ['ANSI31', 'ANSI32', 'ANSI33']
     
     count = 0
-    for i, poly in enumerate(valid_regions):
-        try:
-            # 核心修正：先尝试计算比例，如果失败则给一个保底值
+    with prof.stage('hatch_write') as st:
+        for i, poly in enumerate(valid_regions):
             try:
-                min_x, min_y, max_x, max_y = poly.bounds
-                diagonal = math.sqrt((max_x - min_x)**2 + (max_y - min_y)**2)
-                adaptive_scale = min(0.8, diagonal * 0.01)
-            except:
-                adaptive_scale = 1.0 # 保底比例
-            
-            hatch = msp.add_hatch(dxfattribs={'layer': 'AA_填充算量层'})
-            hatch.rgb = rgb_list[i % len(rgb_list)]
-            hatch.set_pattern_fill(patterns[i % len(patterns)], scale=adaptive_scale)
-            
-            # 坐标写入
-            hatch.paths.add_polyline_path(list(poly.exterior.coords)[:-1], is_closed=True)
-            for interior in poly.interiors:
-                hatch.paths.add_polyline_path(list(interior.coords)[:-1], is_closed=True)
-            count += 1
-        except Exception as e:
-            continue
+                # 核心修正：先尝试计算比例，如果失败则给一个保底值
+                try:
+                    min_x, min_y, max_x, max_y = poly.bounds
+                    diagonal = math.sqrt((max_x - min_x)**2 + (max_y - min_y)**2)
+                    adaptive_scale = min(0.8, diagonal * 0.01)
+                except:
+                    adaptive_scale = 1.0 # 保底比例
+                
+                # 坐标写入
+                hatches.add_polygon(poly, patterns[i % len(patterns)], adaptive_scale, rgb_list[i % len(rgb_list)])
+                count += 1
+            except Exception as e:
+                continue
+        st['hatches'], st['vertices_in'], st['vertices_out'] = count, hatches.vertices_in, hatches.vertices_out
+    print(f"  {hatches.summary()}")
 
-    doc.saveas(output_path)
+    with prof.stage('saveas'): out_doc.saveas(output_path)
+    prof.write(os.path.splitext(output_path)[0])
     return count
 
-def main():
+def main(argv=None):
     print("="*50)
     print("      断面填充算量版 (极致稳定/自适应比例)")
     print("="*50)
@@ -94,20 +106,25 @@ def main():
     print("      3. 0 误差算量内核")
     print("="*50 + "\n")
 
-    files = sys.argv[1:]
-    if not files:
+    parser = add_batch_arguments(argparse.ArgumentParser())
+    parser.add_argument("--tile-size", type=float, default=0, help="分块边长（图纸单位），0 为整图一次构面")
+    parser.add_argument("--workers", type=int, default=1, help="分块构面并行进程数")
+    parser.add_argument("--overlay", action="store_true", help="只输出填充图层的叠加图（_算量自适应版_overlay.dxf），不整图另存")
+    add_hatch_arguments(parser)
+    parser.add_argument("--profile", action="store_true", help="输出分阶段耗时/内存剖析报告（_profile.json / _profile.csv）")
+    args = parser.parse_args(argv)
+    if not args.files:
         print("[提示] 请将一个或多个 DXF 拖动到此图标上运行。")
-        time.sleep(5)
+        if not args.no_pause: time.sleep(5)
         return
 
-    for f in files:
-        if f.lower().endswith('.dxf'):
-            print(f"正在处理: {os.path.basename(f)} ... ", end="", flush=True)
-            num = process_dxf_final(f)
-            print(f"完成！生成填充块: {num}")
+    # 返回值为生成的填充块数量
+    results = run_batch(process_dxf_final, args.files, jobs=args.jobs, tile_size=args.tile_size, workers=args.workers, profile=args.profile, overlay=args.overlay, **hatch_options(args))
     
     print("\n[任务结束] 请在 CAD 中核对生成的文件。")
-    input("按回车键退出程序...")
+    pause(args, "按回车键退出程序...")
+    return 0 if all(r[1] for r in results) else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()
+    sys.exit(launch('final', sys.argv[1:], main, _IMPORT_T0))
\ No newline at end of file